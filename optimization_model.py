@@ -14,11 +14,15 @@ This script:
 import os
 import sys
 import json
+import math
 import logging
+import time
 import requests
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 import sqlite3
+import numpy as np
 
 # Configure logging
 logging.basicConfig(
@@ -35,22 +39,338 @@ logger = logging.getLogger('OptimizationModel')
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:3000/api')
 DB_PATH = os.getenv('DB_PATH', './prisma/dev.db')
 MODEL_ID = f"RMO_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+# Market data records fetched, optimized and saved per batch
+BATCH_SIZE = int(os.getenv('OPTIMIZATION_BATCH_SIZE', '5000'))
+# Set to 1 to optimize record by record (slow, for debugging the array path)
+PER_RECORD = os.getenv('OPTIMIZATION_PER_RECORD', '0') == '1'
+# Set to region or state to optimize each partition of the window in its own process
+PARTITION_BY = os.getenv('OPTIMIZATION_PARTITION_BY', '')
+# Worker processes for partitioned runs (default: one per CPU)
+WORKERS = int(os.getenv('OPTIMIZATION_WORKERS', '0')) or os.cpu_count() or 1
+# Set to 1 to keep running, optimizing ElectricityData rows as they arrive
+CONTINUOUS = os.getenv('OPTIMIZATION_CONTINUOUS', '0') == '1'
+# Seconds between checks for new rows in continuous mode
+POLL_INTERVAL = float(os.getenv('OPTIMIZATION_POLL_INTERVAL', '1'))
+
+# Assumed average market price (Rs/MWh) the price bands are set around
+AVG_PRICE = 4500
+
+# Market data fields the optimization reads as numbers
+NUMERIC_FIELDS = ['generation_mw', 'capacity_mw', 'demand_mw', 'price_rs_per_mwh']
+
+# Market data window, newest first
+MARKET_DATA_QUERY = """
+    SELECT 
+        id, time_period, region, state, technology_type,
+        plant_name, contract_type, generation_mw, 
+        capacity_mw, demand_mw, price_rs_per_mwh
+    FROM ElectricityData
+    WHERE time_period >= ?
+    ORDER BY time_period DESC
+"""
+
+# Columns the window can be partitioned on (records are independent across them)
+PARTITION_COLUMNS = ['region', 'state']
+
+# One partition of the market data window; {column} is one of PARTITION_COLUMNS
+PARTITION_DATA_QUERY = """
+    SELECT 
+        id, time_period, region, state, technology_type,
+        plant_name, contract_type, generation_mw, 
+        capacity_mw, demand_mw, price_rs_per_mwh
+    FROM ElectricityData
+    WHERE time_period >= ? AND {column} = ?
+    ORDER BY time_period DESC
+"""
+
+# Rows added after a (created_at, id) watermark, oldest first; {after} is
+# the watermark condition, left out when nothing has been processed yet
+NEW_DATA_QUERY = """
+    SELECT 
+        id, time_period, region, state, technology_type,
+        plant_name, contract_type, generation_mw, 
+        capacity_mw, demand_mw, price_rs_per_mwh, created_at
+    FROM ElectricityData
+    {after}
+    ORDER BY created_at, id
+    LIMIT ?
+"""
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """Elementwise round(value, 2), identical to Python's round for every element"""
+    values = np.asarray(values, dtype=float)
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    
+    # rint can only disagree with Python's correctly rounded result where
+    # the error of values * 100 may reach the .5 boundary (or it is not finite)
+    with np.errstate(invalid='ignore'):
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        suspect = ~(distance > np.abs(scaled) * 2.0 ** -50)
+    if suspect.any():
+        rounded[suspect] = [round(value, 2) for value in values[suspect].tolist()]
+    return rounded
+
+
+def columns_from_records(records: List[Dict], names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Convert market data records to columns: numeric fields as float arrays
+    with missing values as 0, everything else as object arrays. Records
+    with a non-numeric value in a numeric field are dropped, as the
+    per-record optimization skips them. names gives the columns when no
+    record is left.
+    """
+    def usable(record):
+        return 'id' in record and all(
+            not record.get(field) or isinstance(record[field], (int, float))
+            for field in NUMERIC_FIELDS
+        )
+    
+    records = [record for record in records if usable(record)]
+    keys = list(records[0].keys()) if records else names or ['id'] + NUMERIC_FIELDS
+    columns = {}
+    for key in keys:
+        if key in NUMERIC_FIELDS:
+            columns[key] = np.array([record.get(key) or 0 for record in records], dtype=float)
+        else:
+            columns[key] = np.array([record.get(key) for record in records], dtype=object)
+    return columns
+
+
+def columns_from_rows(rows: List[tuple], names: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Build columns straight from cursor tuples: numeric fields as float
+    arrays with missing values as 0, the rest as object arrays with
+    repeated strings interned, so each distinct region, plant or time
+    period is held once. Rows with text in a numeric field fall back to
+    columns_from_records, which drops them.
+    """
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    columns = {}
+    for name, column in zip(names, values):
+        if name in NUMERIC_FIELDS:
+            try:
+                array = np.array(column, dtype=float)
+            except (TypeError, ValueError):
+                return columns_from_records([dict(zip(names, row)) for row in rows], names)
+            array[np.isnan(array)] = 0
+            columns[name] = array
+        elif name == 'id':
+            columns[name] = np.array(column, dtype=object)
+        else:
+            columns[name] = np.array(
+                [sys.intern(value) if isinstance(value, str) else value for value in column], dtype=object
+            )
+    return columns
+
+
+def records_from_columns(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    """Convert columns back to one dict per record"""
+    keys = list(columns.keys())
+    return [dict(zip(keys, values)) for values in zip(*(columns[key].tolist() for key in keys))]
+
+
+def columns_from_results(results: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convert per-record optimization results to the columnar result layout"""
+    keys = list(results[0].keys()) if results else []
+    return {key: np.array([result[key] for result in results], dtype=object) for key in keys}
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative error bound (DDSketch).
+    Values are counted in logarithmic buckets, so any quantile comes back
+    within relative_accuracy of a value at that rank, and sketches of
+    separate streams merge by adding bucket counts.
+    """
+    
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+    
+    def update(self, values: np.ndarray):
+        """Add a batch of values; non-finite values are ignored"""
+        values = values[np.isfinite(values)]
+        for buckets, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                buckets[key] = buckets.get(key, 0) + count
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+    
+    def merge(self, other: 'QuantileSketch'):
+        """Add another sketch with the same relative accuracy"""
+        for buckets, other_buckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), None when empty"""
+        if self.count == 0:
+            return None
+        
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative values first: largest negative bucket key first
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self.bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self.bucket_value(key)
+        return self.bucket_value(max(self.positive))
+    
+    def bucket_value(self, key: int) -> float:
+        # Bucket key holds (gamma^(key - 1), gamma^key]; this is within the bound of both ends
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+class RunningStats:
+    """
+    Online statistics of a stream of value batches: count, mean and
+    variance (Welford, combined per batch with Chan's parallel formula),
+    min, max, the sum and a quantile sketch. Mergeable across workers.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = float('inf')
+        self.maximum = float('-inf')
+        # Summed left to right like sum() over the whole stream
+        self.total = 0
+        self.sketch = QuantileSketch()
+    
+    def update(self, values: np.ndarray):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self.combine(len(values), batch_mean, batch_m2)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self.total = sum(values.tolist(), self.total)
+        self.sketch.update(values)
+    
+    def merge(self, other: 'RunningStats'):
+        """Add the statistics of another stream"""
+        if other.count == 0:
+            return
+        self.combine(other.count, other.mean, other.m2)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+    
+    def combine(self, count: int, mean: float, m2: float):
+        total_count = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total_count
+        self.m2 += m2 + delta * delta * self.count * count / total_count
+        self.count = total_count
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile from the sketch, kept within the exact min and max"""
+        value = self.sketch.quantile(q)
+        return None if value is None else min(max(value, self.minimum), self.maximum)
+
+
+class MetricsAccumulator:
+    """
+    Running accuracy, revenue impact and improvement statistics over
+    batches of columnar results. Accumulators of separate workers merge,
+    so metrics never need the whole result set in memory.
+    """
+    
+    def __init__(self):
+        self.accuracy = RunningStats()
+        self.revenue = RunningStats()
+        self.improvement = RunningStats()
+    
+    @property
+    def count(self) -> int:
+        return self.accuracy.count
+    
+    def update(self, results: Dict[str, np.ndarray]):
+        """Add a batch of results"""
+        if len(results.get('accuracy_score', [])) == 0:
+            return
+        self.accuracy.update(results['accuracy_score'])
+        self.revenue.update(results['revenue_impact_rs'])
+        self.improvement.update(results['improvement_mw'])
+    
+    def merge(self, other: 'MetricsAccumulator') -> 'MetricsAccumulator':
+        """Add another accumulator's statistics; returns self"""
+        self.accuracy.merge(other.accuracy)
+        self.revenue.merge(other.revenue)
+        self.improvement.merge(other.improvement)
+        return self
+
+
+def optimize_partition(model_id: str, db_path: str, cutoff_time: datetime, column: str,
+                       value: str) -> Tuple[Dict[str, np.ndarray], MetricsAccumulator]:
+    """
+    Process pool worker: optimize one partition of the window over its own
+    read-only connection, returning the results and their metrics
+    """
+    model = OptimizationModel(model_id=model_id, db_path=db_path)
+    conn = model.connect_to_database(read_only=True)
+    try:
+        accumulator = MetricsAccumulator()
+        batches = []
+        for market_data in model.iter_market_data(conn, cutoff_time=cutoff_time, partition=(column, value)):
+            # Every row of the batch was unusable
+            if len(market_data['id']) == 0:
+                continue
+            results = model.optimize_batch(market_data)
+            accumulator.update(results)
+            batches.append(results)
+    finally:
+        conn.close()
+    
+    if not batches:
+        return {}, accumulator
+    results = {key: np.concatenate([batch[key] for batch in batches]) for key in batches[0]}
+    return results, accumulator
 
 
 class OptimizationModel:
     """RMO Optimization Model"""
     
-    def __init__(self):
-        self.model_id = MODEL_ID
+    def __init__(self, model_id: Optional[str] = None, db_path: Optional[str] = None):
+        self.model_id = model_id or MODEL_ID
         self.api_base = API_BASE_URL
-        self.db_path = DB_PATH
+        self.db_path = db_path or DB_PATH
         self.results = []
         logger.info(f"Initialized Optimization Model: {self.model_id}")
     
-    def connect_to_database(self) -> sqlite3.Connection:
-        """Connect to SQLite database"""
+    def connect_to_database(self, read_only: bool = False) -> sqlite3.Connection:
+        """Connect to SQLite database, read-only for partition workers"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            if read_only:
+                conn = sqlite3.connect(f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.db_path)
             conn.row_factory = sqlite3.Row
             logger.info(f"Connected to database: {self.db_path}")
             return conn
@@ -58,30 +378,218 @@ class OptimizationModel:
             logger.error(f"Database connection failed: {str(e)}")
             raise
     
-    def fetch_market_data(self, conn: sqlite3.Connection, hours: int = 24) -> List[Dict]:
-        """Fetch recent market data from database"""
+    def ensure_indexes(self, conn: sqlite3.Connection):
+        """
+        Make sure the time_period window filter can use an index. Uses the
+        name Prisma gives the schema's @@index([time_period]), so a migrated
+        database is left as it is.
+        """
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS "ElectricityData_time_period_idx"
+            ON "ElectricityData"("time_period")
+        """)
+        conn.commit()
+    
+    def prepare_continuous(self, conn: sqlite3.Connection):
+        """
+        Index the (created_at, id) watermark order so polling for new rows
+        is a short index range scan, and create the watermark table. Its
+        created_at column has no declared type so the value keeps the
+        storage class ElectricityData uses (Prisma stores epoch millis).
+        """
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS "ElectricityData_created_at_id_idx"
+            ON "ElectricityData"("created_at", "id")
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS OptimizationWatermark (
+                source TEXT PRIMARY KEY,
+                created_at,
+                record_id TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+    
+    def load_watermark(self, conn: sqlite3.Connection) -> Optional[Tuple]:
+        """
+        Last processed (created_at, id). Without a stored watermark this
+        starts at the newest existing row: earlier data is left to the
+        windowed run, continuous mode only optimizes what arrives later.
+        """
+        row = conn.execute(
+            "SELECT created_at, record_id FROM OptimizationWatermark WHERE source = 'ElectricityData'"
+        ).fetchone()
+        if row is None:
+            row = conn.execute("SELECT created_at, id FROM ElectricityData ORDER BY created_at DESC, id DESC LIMIT 1").fetchone()
+        return tuple(row) if row else None
+    
+    def save_watermark(self, conn: sqlite3.Connection, watermark: Tuple):
+        """Record the watermark; committed together with the results it covers"""
+        conn.execute("""
+            INSERT INTO OptimizationWatermark (source, created_at, record_id, updated_at)
+            VALUES ('ElectricityData', ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source) DO UPDATE SET
+                created_at = excluded.created_at,
+                record_id = excluded.record_id,
+                updated_at = excluded.updated_at
+        """, watermark)
+    
+    def fetch_new_market_data(self, conn: sqlite3.Connection, watermark: Optional[Tuple],
+                              batch_size: int = BATCH_SIZE) -> Tuple[Dict[str, np.ndarray], Optional[Tuple]]:
+        """Next batch of rows after the watermark, as columns, and the watermark after them"""
+        if watermark is None:
+            cursor = conn.execute(NEW_DATA_QUERY.format(after=''), (batch_size,))
+        else:
+            cursor = conn.execute(NEW_DATA_QUERY.format(after='WHERE (created_at, id) > (?, ?)'),
+                                  (*watermark, batch_size))
+        cursor.row_factory = None
+        names = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            return {}, watermark
+        # Taken from the raw rows: columns_from_rows may drop unusable ones
+        return columns_from_rows(rows, names), (rows[-1][-1], rows[-1][0])
+    
+    def fetch_market_data(self, conn: sqlite3.Connection, hours: int = 24,
+                          columnar: bool = False) -> Union[List[Dict], Dict[str, np.ndarray]]:
+        """
+        Fetch recent market data from database, as a list of records or,
+        with columnar, as arrays filled straight from the cursor rows
+        """
         try:
             cutoff_time = datetime.now() - timedelta(hours=hours)
-            query = """
-                SELECT 
-                    id, time_period, region, state, technology_type,
-                    plant_name, contract_type, generation_mw, 
-                    capacity_mw, demand_mw, price_rs_per_mwh
-                FROM ElectricityData
-                WHERE time_period >= ?
-                ORDER BY time_period DESC
-            """
-            cursor = conn.execute(query, (cutoff_time.isoformat(),))
+            cursor = conn.execute(MARKET_DATA_QUERY, (cutoff_time.isoformat(),))
+            if columnar:
+                cursor.row_factory = None
+                names = [column[0] for column in cursor.description]
+                data = columns_from_rows(cursor.fetchall(), names)
+                logger.info(f"Fetched {len(data['id'])} records from database")
+                return data
+            
             data = [dict(row) for row in cursor.fetchall()]
             logger.info(f"Fetched {len(data)} records from database")
             return data
         except Exception as e:
             logger.error(f"Failed to fetch market data: {str(e)}")
-            return []
+            return {} if columnar else []
+    
+    def iter_market_data(self, conn: sqlite3.Connection, hours: int = 24,
+                         batch_size: int = BATCH_SIZE, cutoff_time: Optional[datetime] = None,
+                         partition: Optional[Tuple[str, str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Stream the same window as fetch_market_data in columnar batches,
+        optionally only the records of one (column, value) partition
+        """
+        cutoff_time = cutoff_time or datetime.now() - timedelta(hours=hours)
+        if partition:
+            column, value = partition
+            if column not in PARTITION_COLUMNS:
+                raise ValueError(f"Cannot partition market data by {column!r}")
+            cursor = conn.execute(PARTITION_DATA_QUERY.format(column=column), (cutoff_time.isoformat(), value))
+        else:
+            cursor = conn.execute(MARKET_DATA_QUERY, (cutoff_time.isoformat(),))
+        cursor.row_factory = None
+        names = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield columns_from_rows(rows, names)
+    
+    def list_partitions(self, conn: sqlite3.Connection, column: str, cutoff_time: datetime) -> List[str]:
+        """Distinct values of a partition column within the window"""
+        if column not in PARTITION_COLUMNS:
+            raise ValueError(f"Cannot partition market data by {column!r}")
+        rows = conn.execute(
+            f"SELECT DISTINCT {column} FROM ElectricityData WHERE time_period >= ? ORDER BY {column}",
+            (cutoff_time.isoformat(),)
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    def process_window(self, conn: sqlite3.Connection, hours: int = 24) -> Tuple[int, MetricsAccumulator]:
+        """Stream the window through optimization in cursor batches, saving each batch's results"""
+        record_count = 0
+        accumulator = MetricsAccumulator()
+        for market_data in self.iter_market_data(conn, hours=hours):
+            # Every row of the batch was unusable
+            if len(market_data['id']) == 0:
+                continue
+            results = self.optimize_batch(market_data)
+            accumulator.update(results)
+            self.save_results_to_db(conn, results)
+            record_count += len(results.get('record_id', []))
+        return record_count, accumulator
+    
+    def process_new_data(self, conn: sqlite3.Connection, watermark: Optional[Tuple],
+                         accumulator: MetricsAccumulator) -> Tuple[int, Optional[Tuple]]:
+        """
+        Optimize every row after the watermark, batch by batch. Each batch's
+        results are committed with its new watermark, so a restart neither
+        skips nor repeats rows. Returns the row count and the new watermark.
+        """
+        record_count = 0
+        while True:
+            market_data, next_watermark = self.fetch_new_market_data(conn, watermark)
+            if next_watermark == watermark:
+                return record_count, watermark
+            
+            results = self.optimize_batch(market_data) if len(market_data['id']) else {}
+            self.save_watermark(conn, next_watermark)
+            if results:
+                if not self.save_results_to_db(conn, results):
+                    conn.rollback()
+                    return record_count, watermark
+                accumulator.update(results)
+                record_count += len(results['record_id'])
+            else:
+                conn.commit()
+            watermark = next_watermark
+    
+    def process_partitions(self, conn: sqlite3.Connection, column: str, hours: int = 24,
+                           workers: int = WORKERS) -> Tuple[int, MetricsAccumulator]:
+        """
+        Optimize each partition of the window in a process pool. Workers
+        read over their own connections; results are saved here, on the one
+        write connection, as partitions finish. Metrics are merged in
+        partition order so the totals do not depend on completion order.
+        """
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        partitions = self.list_partitions(conn, column, cutoff_time)
+        if not partitions:
+            return 0, MetricsAccumulator()
+        
+        workers = max(1, min(workers, len(partitions)))
+        logger.info(f"Optimizing {len(partitions)} {column} partitions with {workers} workers")
+        record_count = 0
+        accumulators = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(optimize_partition, self.model_id, self.db_path, cutoff_time, column, value): value
+                for value in partitions
+            }
+            for future in as_completed(futures):
+                results, accumulators[futures[future]] = future.result()
+                if results:
+                    self.save_results_to_db(conn, results)
+                    record_count += len(results['record_id'])
+        
+        accumulator = MetricsAccumulator()
+        for value in partitions:
+            accumulator.merge(accumulators[value])
+        return record_count, accumulator
+    
+    def optimize_batch(self, market_data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Optimize a columnar batch of market data into columnar results"""
+        if PER_RECORD:
+            return columns_from_results(self.run_optimization(records_from_columns(market_data)))
+        return self.optimize_columns(market_data)
     
     def run_optimization(self, market_data: List[Dict]) -> List[Dict]:
         """
-        Run optimization algorithm
+        Run optimization algorithm record by record. run() uses the array
+        version, optimize_columns; this path is kept for debugging
+        (OPTIMIZATION_PER_RECORD=1).
         
         This is a simplified example. In production, this would:
         - Use linear programming (scipy.optimize, CVXPY, Pyomo, etc.)
@@ -106,7 +614,7 @@ class OptimizationModel:
                 # 2. If price is low, reduce to minimum safe level
                 # 3. Respect capacity constraints
                 
-                avg_price = 4500  # Assumed average market price
+                avg_price = AVG_PRICE  # Assumed average market price
                 optimal_gen = current_gen
                 
                 if price > avg_price * 1.1 and capacity > current_gen:
@@ -147,27 +655,80 @@ class OptimizationModel:
         logger.info(f"Optimization complete. Generated {len(optimized_results)} results")
         return optimized_results
     
-    def calculate_accuracy_metrics(self, results: List[Dict]) -> Dict:
+    def optimize_columns(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Array version of run_optimization: applies the price-band rule to
+        all records at once and returns the results as columns, keyed like
+        the per-record result dicts. Values match run_optimization exactly.
+        """
+        logger.info("Running optimization algorithm...")
+        
+        current_gen = columns['generation_mw']
+        capacity = columns['capacity_mw']
+        demand = columns['demand_mw']
+        price = columns['price_rs_per_mwh']
+        count = len(price)
+        
+        # High price with spare capacity: increase generation; low price:
+        # reduce to minimum safe level; otherwise match demand
+        high = (price > AVG_PRICE * 1.1) & (capacity > current_gen)
+        low = ~high & (price < AVG_PRICE * 0.9)
+        optimal_gen = np.where(
+            high, np.minimum(capacity * 0.95, demand * 1.05),
+            np.where(low, np.maximum(capacity * 0.3, demand * 0.8), np.minimum(capacity * 0.85, demand))
+        )
+        
+        # Calculate metrics
+        improvement = optimal_gen - current_gen
+        revenue_impact = improvement * price
+        with np.errstate(divide='ignore', invalid='ignore'):
+            accuracy_score = np.where(demand > 0, 100 - np.abs((optimal_gen - demand) / demand * 100), 95)
+        
+        results = {
+            'record_id': columns['id'],
+            'time_period': columns['time_period'],
+            'plant_name': columns['plant_name'],
+            'current_generation_mw': current_gen,
+            'optimal_generation_mw': round2(optimal_gen),
+            'improvement_mw': round2(improvement),
+            'price_rs_per_mwh': price,
+            'revenue_impact_rs': round2(revenue_impact),
+            'accuracy_score': round2(accuracy_score),
+            'model_id': np.full(count, self.model_id, dtype=object),
+            'timestamp': np.full(count, datetime.now().isoformat(), dtype=object)
+        }
+        
+        logger.info(f"Optimization complete. Generated {count} results")
+        return results
+    
+    def calculate_accuracy_metrics(self, results: Dict[str, np.ndarray]) -> Dict:
         """Calculate overall model accuracy metrics"""
-        if not results:
+        accumulator = MetricsAccumulator()
+        accumulator.update(results)
+        return self.report_metrics(accumulator)
+    
+    def report_metrics(self, accumulator: MetricsAccumulator) -> Dict:
+        """Overall model accuracy metrics from a metrics accumulator"""
+        if accumulator.count == 0:
             return {}
         
-        accuracy_scores = [r['accuracy_score'] for r in results]
-        revenue_impacts = [r['revenue_impact_rs'] for r in results]
-        improvements = [r['improvement_mw'] for r in results]
-        
+        accuracy = accumulator.accuracy
         metrics = {
             'model_id': self.model_id,
-            'total_records': len(results),
-            'avg_accuracy': round(sum(accuracy_scores) / len(accuracy_scores), 2),
-            'min_accuracy': round(min(accuracy_scores), 2),
-            'max_accuracy': round(max(accuracy_scores), 2),
-            'total_revenue_impact': round(sum(revenue_impacts), 2),
-            'avg_improvement_mw': round(sum(improvements) / len(improvements), 2),
+            'total_records': accumulator.count,
+            'avg_accuracy': round(accuracy.total / accuracy.count, 2),
+            'min_accuracy': round(accuracy.minimum, 2),
+            'max_accuracy': round(accuracy.maximum, 2),
+            'p5_accuracy': round(accuracy.quantile(0.05), 2),
+            'p50_accuracy': round(accuracy.quantile(0.5), 2),
+            'p95_accuracy': round(accuracy.quantile(0.95), 2),
+            'total_revenue_impact': round(accumulator.revenue.total, 2),
+            'avg_improvement_mw': round(accumulator.improvement.total / accumulator.count, 2),
             'timestamp': datetime.now().isoformat()
         }
         
         logger.info(f"Accuracy Metrics - Avg: {metrics['avg_accuracy']}%, Range: {metrics['min_accuracy']}-{metrics['max_accuracy']}%")
+        logger.info(f"Accuracy Percentiles - P5: {metrics['p5_accuracy']}%, P50: {metrics['p50_accuracy']}%, P95: {metrics['p95_accuracy']}%")
         logger.info(f"Revenue Impact: ₹{metrics['total_revenue_impact']:,.2f}")
         
         return metrics
@@ -196,7 +757,7 @@ class OptimizationModel:
             logger.error(f"Error logging to system: {str(e)}")
             return False
     
-    def save_results_to_db(self, conn: sqlite3.Connection, results: List[Dict]) -> bool:
+    def save_results_to_db(self, conn: sqlite3.Connection, results: Dict[str, np.ndarray]) -> bool:
         """Save optimization results back to database"""
         try:
             # Create results table if not exists
@@ -218,28 +779,21 @@ class OptimizationModel:
             """)
             
             # Insert results
-            for result in results:
-                conn.execute("""
-                    INSERT INTO OptimizationResults 
-                    (model_id, record_id, time_period, plant_name, current_generation_mw, 
-                     optimal_generation_mw, improvement_mw, price_rs_per_mwh, 
-                     revenue_impact_rs, accuracy_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    result['model_id'],
-                    result['record_id'],
-                    result['time_period'],
-                    result['plant_name'],
-                    result['current_generation_mw'],
-                    result['optimal_generation_mw'],
-                    result['improvement_mw'],
-                    result['price_rs_per_mwh'],
-                    result['revenue_impact_rs'],
-                    result['accuracy_score']
-                ))
+            fields = [
+                'model_id', 'record_id', 'time_period', 'plant_name', 'current_generation_mw',
+                'optimal_generation_mw', 'improvement_mw', 'price_rs_per_mwh',
+                'revenue_impact_rs', 'accuracy_score'
+            ]
+            conn.executemany("""
+                INSERT INTO OptimizationResults 
+                (model_id, record_id, time_period, plant_name, current_generation_mw, 
+                 optimal_generation_mw, improvement_mw, price_rs_per_mwh, 
+                 revenue_impact_rs, accuracy_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, zip(*[results[field].tolist() for field in fields]))
             
             conn.commit()
-            logger.info(f"Saved {len(results)} optimization results to database")
+            logger.info(f"Saved {len(results['record_id'])} optimization results to database")
             return True
             
         except Exception as e:
@@ -255,33 +809,36 @@ class OptimizationModel:
         try:
             # Step 1: Connect to database
             conn = self.connect_to_database()
+            self.ensure_indexes(conn)
             
-            # Step 2: Fetch market data
-            logger.info("Step 1: Fetching market data...")
-            market_data = self.fetch_market_data(conn, hours=24)
+            # Steps 2-4: Stream the window through optimization in cursor
+            # batches (or one worker process per partition), saving results
+            # as they come
+            logger.info("Step 1: Streaming market data through optimization...")
+            start_time = datetime.now()
+            if PARTITION_BY:
+                record_count, accumulator = self.process_partitions(conn, PARTITION_BY, hours=24)
+            else:
+                record_count, accumulator = self.process_window(conn, hours=24)
             
-            if not market_data:
+            if record_count == 0:
                 logger.warning("No market data found. Exiting.")
                 return
             
-            # Step 3: Run optimization
-            logger.info("Step 2: Running optimization algorithm...")
-            results = self.run_optimization(market_data[:100])  # Process last 100 records
+            elapsed = (datetime.now() - start_time).total_seconds()
+            records_per_sec = record_count / elapsed if elapsed > 0 else float('inf')
+            logger.info(f"Processed {record_count} records in {elapsed:.2f}s ({records_per_sec:,.0f} records/sec)")
             
-            # Step 4: Calculate accuracy metrics
-            logger.info("Step 3: Calculating accuracy metrics...")
-            metrics = self.calculate_accuracy_metrics(results)
-            
-            # Step 5: Save results to database
-            logger.info("Step 4: Saving results to database...")
-            self.save_results_to_db(conn, results)
+            # Step 5: Calculate accuracy metrics from the running statistics
+            logger.info("Step 2: Calculating accuracy metrics...")
+            metrics = self.report_metrics(accumulator)
             
             # Step 6: Log to system
-            logger.info("Step 5: Logging to dashboard system...")
+            logger.info("Step 3: Logging to dashboard system...")
             self.log_to_system(
                 activity_type='optimization',
                 title=f'Optimization Model Executed: {self.model_id}',
-                description=f"Processed {len(results)} records with {metrics['avg_accuracy']}% accuracy",
+                description=f"Processed {record_count} records with {metrics['avg_accuracy']}% accuracy",
                 metadata=metrics
             )
             
@@ -290,7 +847,7 @@ class OptimizationModel:
             logger.info("EXECUTION SUMMARY")
             logger.info("=" * 60)
             logger.info(f"Model ID: {self.model_id}")
-            logger.info(f"Records Processed: {len(results)}")
+            logger.info(f"Records Processed: {record_count}")
             logger.info(f"Average Accuracy: {metrics['avg_accuracy']}%")
             logger.info(f"Total Revenue Impact: ₹{metrics['total_revenue_impact']:,.2f}")
             logger.info(f"Average Improvement: {metrics['avg_improvement_mw']:.2f} MW")
@@ -305,13 +862,53 @@ class OptimizationModel:
         except Exception as e:
             logger.error(f"Optimization model execution failed: {str(e)}")
             raise
+    
+    def run_continuous(self, poll_interval: float = POLL_INTERVAL, max_polls: Optional[int] = None):
+        """
+        Keep optimizing ElectricityData rows as they are added, after the
+        stored (created_at, id) watermark, appending to OptimizationResults.
+        Between polls only PRAGMA data_version is read, which changes when
+        another connection commits; the table is queried only then. Runs
+        until interrupted (or max_polls) and returns the session's metrics.
+        """
+        logger.info("=" * 60)
+        logger.info("Starting Continuous Optimization")
+        logger.info("=" * 60)
+        
+        conn = self.connect_to_database()
+        accumulator = MetricsAccumulator()
+        try:
+            self.prepare_continuous(conn)
+            watermark = self.load_watermark(conn)
+            logger.info(f"Watching ElectricityData after watermark {watermark} every {poll_interval}s")
+            
+            data_version = None
+            polls = 0
+            while max_polls is None or polls < max_polls:
+                polls += 1
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    start_time = time.perf_counter()
+                    record_count, watermark = self.process_new_data(conn, watermark, accumulator)
+                    if record_count:
+                        elapsed = time.perf_counter() - start_time
+                        logger.info(f"Optimized {record_count} new records in {elapsed:.3f}s, watermark {watermark}")
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            logger.info("Continuous optimization stopped")
+        finally:
+            conn.close()
+        
+        logger.info(f"Session total: {accumulator.count} records")
+        return self.report_metrics(accumulator)
 
 
 def main():
     """Entry point"""
     try:
         model = OptimizationModel()
-        results = model.run()
+        results = model.run_continuous() if CONTINUOUS else model.run()
         
         # Save summary to JSON file
         summary_file = f"optimization_summary_{MODEL_ID}.json"
@@ -2,58 +2,786 @@
 """
 RMO Optimization Runner
 Reads data from SQLite, runs optimization model, saves results back to database
+
+Run once per data source, as a batch over many data sources in one
+process (--batch), or as a long-lived worker (--worker) that reads JSON-line
+jobs from stdin or a Unix socket and answers each with one JSON result line.
 """
 
+import argparse
+import os
 import sys
 import json
+import hashlib
+import multiprocessing
+import queue
 import sqlite3
+import signal
+import socketserver
+import subprocess
+import tempfile
+import threading
 import pandas as pd
 import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
 
 try:
     from pulp import *
+    import pulp
 except ImportError:
     print(json.dumps({"success": False, "error": "PuLP not installed. Run: pip install pulp"}))
     sys.exit(1)
 
+try:
+    from scipy.optimize import linprog
+    from scipy.sparse import csr_matrix
+except ImportError:
+    # Only needed for the 'scipy' solver backend
+    linprog = None
+    csr_matrix = None
+
+try:
+    import highspy
+except ImportError:
+    # Only needed for the 'highs' solver backend
+    highspy = None
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    # Only needed for the columnar result export ('export_dir')
+    pyarrow = None
+
+# Runner options. The data source config's "optimization" object overrides
+# these, and a JSON object on the command line overrides both.
+DEFAULT_OPTIONS = {
+    'model_builder': 'matrix',     # 'matrix' or 'pulp' (reference)
+    'cross_check': False,          # also solve the PuLP reference model
+    'solver': 'cbc',               # 'cbc', 'highs' or 'scipy' (in-process)
+    'threads': 0,                  # solver threads, 0 = all cores
+    'time_limit': None,            # solver time limit in seconds
+    'mip_gap': None,               # relative MIP gap
+    'merit_order': True,           # closed-form solve when the model allows it
+    'warm_start': True,            # start LP solves from the previous run's results
+    'compact_dtypes': True,        # categoricals / float32 / small ints after prepare
+    'horizon_start': None,         # only read time periods from this date/time
+    'horizon_end': None,           # ...up to (excluding) this date/time
+    'chunk_size': None,            # stream the table in chunks of this many rows
+    'incremental': False,          # re-solve only time blocks whose inputs changed
+    'decompose': False,            # solve time blocks as parallel sub-problems
+    'workers': 0,                  # decomposition processes, 0 = all cores
+    'write_batch_size': 5000,      # result rows per executemany call
+    'staged_write': False,         # stage rows in a temp table, publish in one short transaction
+    'export_dir': None,            # also write each run as a columnar file here
+    'export_format': 'parquet'     # 'parquet' (zstd) or 'arrow' (Arrow IPC file)
+}
+
+
+# Excel serial day 0; uploads carry time periods as serial days
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+# Time period formats found in data source tables: Excel serial days, the
+# sample generators' 'YYYY-MM-DD HH:MM:SS', and other ISO 8601 strings
+TIME_FORMATS = {
+    'serial': None,
+    'datetime': '%Y-%m-%d %H:%M:%S',
+    'iso': 'ISO8601'
+}
+
+# Rows sampled to detect a timeperiod column's format
+TIME_FORMAT_SAMPLE = 1000
+
+# Detected timeperiod format per (db_path, data_source_id)
+_time_format_cache = {}
+
+# OptimizationResult columns written per result row, in insert order
+RESULT_TABLE_COLUMNS = [
+    'id', 'data_source_id', 'model_id', 'model_trigger_time',
+    'time_period', 'time_block', 'technology_type', 'region', 'state',
+    'contract_type', 'plant_name', 'contract_name',
+    'dam_price', 'gdam_price', 'rtm_price',
+    'scheduled_mw', 'model_results_mw',
+    'optimization_status', 'solver_time_ms', 'objective_value',
+    'created_at'
+]
+
+# Columnar export file suffix per 'export_format'
+EXPORT_SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Serializes manifest.json updates from concurrent runs
+_manifest_lock = threading.Lock()
+
+# Model variables are keyed by (plant, time block) cell
+CELL_KEYS = ['plantname', 'timeblock']
+
+# (Lowercased) input columns the model reads; everything else stays in SQLite
+MODEL_COLUMNS = [
+    'plantname', 'timeblock', 'timeperiod',
+    'damprice', 'gdamprice', 'rtmprice', 'scheduledmw', 'modelresultsmw',
+    'technologytype', 'region', 'state', 'contracttype', 'contractname'
+]
+
+NUMERIC_COLUMNS = ['damprice', 'gdamprice', 'rtmprice', 'scheduledmw', 'modelresultsmw']
+
+# Repeated attribute strings, stored as categoricals when compacting
+CATEGORICAL_COLUMNS = ['plantname', 'region', 'state', 'technologytype', 'contracttype', 'contractname']
+
+# Result field -> (lowercased) input column, with the default used when absent
+RESULT_COLUMNS = [
+    ('scheduled_mw', 'scheduledmw', 0),
+    ('dam_price', 'damprice', 0),
+    ('gdam_price', 'gdamprice', 0),
+    ('rtm_price', 'rtmprice', 0),
+    ('technology_type', 'technologytype', ''),
+    ('region', 'region', ''),
+    ('state', 'state', ''),
+    ('contract_type', 'contracttype', ''),
+    ('contract_name', 'contractname', ''),
+    ('time_period', 'timeperiod', datetime.now)
+]
+
+
+class RMOMatrixModel:
+    """
+    Matrix form of the RMO LP, built straight from the model arrays
+    without any PuLP expression objects:
+    
+        minimize    c @ x
+        subject to  0 <= x <= upper
+                    A @ x >= demand      (one row per demand-constrained block)
+    
+    Column j is plant j // n_blocks in time block j % n_blocks, and A is
+    kept as raw CSR arrays (data, indices, indptr).
+    """
+    
+    def __init__(self, arrays):
+        n_plants, n_blocks = arrays['cost'].shape
+        self.shape = (n_plants, n_blocks)
+        self.c = arrays['cost'].ravel()
+        self.upper = arrays['cap'].ravel()
+        
+        self.blocks = np.flatnonzero(arrays['demand'] > 0)
+        self.row_lower = arrays['demand'][self.blocks]
+        
+        # Row r covers every plant of block blocks[r]
+        self.indptr = np.arange(len(self.blocks) + 1) * n_plants
+        self.indices = (self.blocks[:, None] + np.arange(n_plants)[None, :] * n_blocks).ravel()
+        self.data = np.ones(len(self.indices))
+    
+    @property
+    def n_cols(self):
+        return len(self.c)
+    
+    def is_block_separable(self):
+        """True when every constraint row only touches columns of one time block"""
+        row_lengths = np.diff(self.indptr)
+        starts = self.indptr[:-1][row_lengths > 0]
+        if len(starts) == 0:
+            return True
+        col_blocks = self.indices % self.shape[1]
+        return bool(np.array_equal(
+            np.minimum.reduceat(col_blocks, starts),
+            np.maximum.reduceat(col_blocks, starts)
+        ))
+    
+    def is_merit_order_form(self):
+        """
+        True when the only constraints are one unit-coefficient demand row
+        per time block, so the LP can be solved by merit order
+        """
+        return (
+            len(np.unique(self.blocks)) == len(self.blocks)
+            and bool(np.all(self.data == 1))
+            and self.is_block_separable()
+        )
+    
+    def to_scipy(self):
+        """Constraint matrix as a scipy.sparse CSR matrix"""
+        if csr_matrix is None:
+            raise Exception("SciPy not installed. Run: pip install scipy")
+        return csr_matrix((self.data, self.indices, self.indptr), shape=(len(self.blocks), self.n_cols))
+    
+    def write_mps(self, path):
+        """Write the model as a free-format MPS file"""
+        # Block -> demand row name, for the single row entry of each column
+        row_of_block = np.full(self.shape[1], -1)
+        row_of_block[self.blocks] = np.arange(len(self.blocks))
+        col_rows = np.tile(row_of_block, self.shape[0])
+        
+        cost = self.c.tolist()
+        col_rows = col_rows.tolist()
+        
+        lines = ['NAME RMO_Optimization FREE', 'ROWS', ' N COST']
+        lines.extend(f' G D{r}' for r in range(len(self.blocks)))
+        lines.append('COLUMNS')
+        for j in range(self.n_cols):
+            entry = f' X{j} COST {cost[j]:.17g}'
+            if col_rows[j] >= 0:
+                entry += f' D{col_rows[j]} 1'
+            lines.append(entry)
+        lines.append('RHS')
+        lines.extend(f' RHS D{r} {rhs:.17g}' for r, rhs in enumerate(self.row_lower.tolist()))
+        lines.append('BOUNDS')
+        finite = np.flatnonzero(np.isfinite(self.upper))
+        lines.extend(f' UP BND X{j} {ub:.17g}' for j, ub in zip(finite.tolist(), self.upper[finite].tolist()))
+        lines.append('ENDATA')
+        
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    
+    def basis_from_solution(self, x, tol=1e-6):
+        """
+        Derive a simplex basis from a primal point, e.g. a previous run's
+        values. Columns strictly between their bounds and demand rows with
+        slack are basic. Returns (col_status, row_basic) with col_status
+        0 = at lower, 1 = basic, 2 = at upper, or None when the point does
+        not describe a valid basis. tol is relative, since stored results
+        carry limited precision.
+        """
+        x = np.clip(x, 0.0, self.upper)
+        upper_scale = np.maximum(np.where(np.isfinite(self.upper), self.upper, 1.0), 1.0)
+        at_upper = self.upper - x <= tol * upper_scale
+        col_status = np.where(x <= tol, 0, np.where(at_upper, 2, 1))
+        
+        row_basic = np.zeros(len(self.blocks), dtype=bool)
+        if len(self.blocks) > 0:
+            starts = self.indptr[:-1]
+            activity = np.add.reduceat(x[self.indices], starts)
+            basic_cols = np.add.reduceat((col_status == 1)[self.indices].astype(int), starts)
+            # A binding row without a basic column is degenerate but still basic
+            row_basic = (activity > self.row_lower + tol * np.maximum(self.row_lower, 1.0)) | (basic_cols == 0)
+        
+        if np.count_nonzero(col_status == 1) + np.count_nonzero(row_basic) != len(self.blocks):
+            return None
+        return col_status, row_basic
+    
+    def solve(self, backend, initial=None):
+        """
+        Solve the model with a SolverBackend and return
+        (optimal, objective_value, values) with values shaped
+        (plants x time blocks).
+        
+        initial is an optional (plants x time blocks) starting point; when
+        the backend supports it, it is passed on as a starting basis and
+        warm_started records whether that happened.
+        """
+        basis = None
+        if initial is not None and backend.supports_warm_start:
+            basis = self.basis_from_solution(np.nan_to_num(initial.ravel()))
+        self.warm_started = basis is not None
+        
+        optimal, x = backend.solve_matrix(self, basis)
+        
+        if x is None:
+            x = np.full(self.n_cols, np.nan)
+        objective_value = float(self.c @ x) if optimal else None
+        return optimal, objective_value, x.reshape(self.shape)
+
+
+class SolverBackend:
+    """
+    Base class for RMO solver backends.
+    
+    A backend solves an RMOMatrixModel directly and supplies the matching
+    PuLP solver for the reference build. threads=0 means all cores.
+    """
+    name = None
+    supports_warm_start = False
+    
+    def __init__(self, threads=0, time_limit=None, mip_gap=None):
+        self.threads = threads or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+    
+    def describe(self):
+        """Solver settings reported in the run summary"""
+        return {
+            'backend': self.name,
+            'threads': self.threads,
+            'time_limit': self.time_limit,
+            'mip_gap': self.mip_gap
+        }
+    
+    def solve_matrix(self, matrix, basis=None):
+        """
+        Return (optimal, x) for an RMOMatrixModel, x None when unsolved.
+        basis is a starting basis from RMOMatrixModel.basis_from_solution.
+        """
+        raise NotImplementedError
+    
+    def pulp_solver(self):
+        """PuLP solver object for the reference build"""
+        raise Exception(f"Solver backend '{self.name}' does not support the PuLP model builder")
+    
+    def solve_scope(self):
+        """Context held around every solve of this backend, PuLP ones included"""
+        return nullcontext()
+
+
+class CBCBackend(SolverBackend):
+    """CBC binary bundled with PuLP, fed through an MPS file"""
+    name = 'cbc'
+    supports_warm_start = True
+    
+    def pulp_solver(self):
+        return PULP_CBC_CMD(msg=0, threads=self.threads, timeLimit=self.time_limit, gapRel=self.mip_gap)
+    
+    def solve_matrix(self, matrix, basis=None):
+        solver = self.pulp_solver()
+        if not solver.available():
+            raise Exception("CBC solver binary not available")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mps_path = os.path.join(tmp_dir, 'rmo.mps')
+            sol_path = os.path.join(tmp_dir, 'rmo.sol')
+            matrix.write_mps(mps_path)
+            
+            command = [solver.path, mps_path, '-threads', str(self.threads)]
+            if basis is not None:
+                basis_path = os.path.join(tmp_dir, 'rmo.bas')
+                self.write_basis(basis, basis_path)
+                command += ['-basisIn', basis_path]
+            if self.time_limit is not None:
+                command += ['-sec', str(self.time_limit)]
+            if self.mip_gap is not None:
+                command += ['-ratioGap', str(self.mip_gap)]
+            command += ['-solve', '-printingOptions', 'all', '-solution', sol_path]
+            
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+            if not os.path.exists(sol_path):
+                return False, None
+            
+            with open(sol_path) as f:
+                status_line = f.readline()
+                x = np.full(matrix.n_cols, np.nan)
+                for line in f:
+                    # "<index> <name> <value> <reduced cost>", '**' marks infeasibilities
+                    fields = line.replace('**', ' ').split()
+                    if len(fields) >= 4 and fields[1].startswith('X'):
+                        x[int(fields[1][1:])] = float(fields[2])
+        
+        return status_line.startswith('Optimal'), x
+    
+    def write_basis(self, basis, path):
+        """Write a basis in MPS basis format, naming columns and rows as write_mps does"""
+        col_status, row_basic = basis
+        basic_cols = np.flatnonzero(col_status == 1)
+        nonbasic_rows = np.flatnonzero(~row_basic)
+        
+        # Each basic column swaps places with a nonbasic row at its lower bound
+        lines = ['NAME']
+        lines.extend(f' XL X{j} D{r}' for j, r in zip(basic_cols.tolist(), nonbasic_rows.tolist()))
+        lines.extend(f' UL X{j}' for j in np.flatnonzero(col_status == 2).tolist())
+        lines.append('ENDATA')
+        
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+class HighsScheduler:
+    """
+    HiGHS sizes a thread scheduler on a thread's first solve and keeps it;
+    a later solve from that thread asking for another thread count does not
+    reach optimal. Solves register here, and a thread's scheduler is reset
+    whenever its thread count changes. Schedulers belong to the calling
+    thread, so batch and worker threads never reset each other's.
+    """
+    
+    def __init__(self):
+        self.local = threading.local()
+    
+    @contextmanager
+    def use(self, threads):
+        current = getattr(self.local, 'threads', None)
+        if current is not None and current != threads:
+            highspy.Highs.resetGlobalScheduler(True)
+        self.local.threads = threads
+        yield
+
+
+_highs_scheduler = HighsScheduler()
+
+
+class HighsBackend(SolverBackend):
+    """HiGHS through the highspy package, model passed in memory"""
+    name = 'highs'
+    supports_warm_start = True
+    
+    def pulp_solver(self):
+        if not hasattr(pulp, 'HiGHS'):
+            raise Exception("Installed PuLP has no HiGHS interface. Run: pip install -U pulp")
+        return pulp.HiGHS(msg=False, threads=self.threads, timeLimit=self.time_limit, gapRel=self.mip_gap)
+    
+    def solve_scope(self):
+        if highspy is None:
+            return nullcontext()
+        return _highs_scheduler.use(self.threads)
+    
+    def solve_matrix(self, matrix, basis=None):
+        if highspy is None:
+            raise Exception("highspy not installed. Run: pip install highspy")
+        
+        with self.solve_scope():
+            return self.run_highs(matrix, basis)
+    
+    def run_highs(self, matrix, basis):
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        h.setOptionValue('threads', self.threads)
+        if self.time_limit is not None:
+            h.setOptionValue('time_limit', float(self.time_limit))
+        if self.mip_gap is not None:
+            h.setOptionValue('mip_rel_gap', float(self.mip_gap))
+        
+        lp = highspy.HighsLp()
+        lp.num_col_ = matrix.n_cols
+        lp.num_row_ = len(matrix.row_lower)
+        lp.col_cost_ = matrix.c
+        lp.col_lower_ = np.zeros(matrix.n_cols)
+        lp.col_upper_ = matrix.upper
+        lp.row_lower_ = matrix.row_lower
+        lp.row_upper_ = np.full(len(matrix.row_lower), highspy.kHighsInf)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.start_ = matrix.indptr
+        lp.a_matrix_.index_ = matrix.indices
+        lp.a_matrix_.value_ = matrix.data
+        h.passModel(lp)
+        
+        if basis is not None:
+            col_status, row_basic = basis
+            status_codes = [
+                highspy.HighsBasisStatus.kLower,
+                highspy.HighsBasisStatus.kBasic,
+                highspy.HighsBasisStatus.kUpper
+            ]
+            highs_basis = highspy.HighsBasis()
+            highs_basis.col_status = [status_codes[code] for code in col_status.tolist()]
+            highs_basis.row_status = [
+                highspy.HighsBasisStatus.kBasic if is_basic else highspy.HighsBasisStatus.kLower
+                for is_basic in row_basic.tolist()
+            ]
+            highs_basis.valid = True
+            h.setBasis(highs_basis)
+        
+        h.run()
+        
+        if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            return False, None
+        return True, np.asarray(h.getSolution().col_value)
+
+
+class ScipyBackend(SolverBackend):
+    """In-process scipy.optimize.linprog (HiGHS) on the CSR matrix"""
+    name = 'scipy'
+    
+    def __init__(self, threads=0, time_limit=None, mip_gap=None):
+        super().__init__(threads, time_limit, mip_gap)
+        # linprog exposes no thread control
+        self.threads = 1
+    
+    def solve_matrix(self, matrix, basis=None):
+        if linprog is None:
+            raise Exception("SciPy not installed. Run: pip install scipy")
+        
+        solver_options = {}
+        if self.time_limit is not None:
+            solver_options['time_limit'] = float(self.time_limit)
+        
+        bounds = np.column_stack([np.zeros(matrix.n_cols), matrix.upper])
+        result = linprog(
+            matrix.c,
+            A_ub=-matrix.to_scipy(),
+            b_ub=-matrix.row_lower,
+            bounds=bounds,
+            method='highs',
+            options=solver_options
+        )
+        return result.status == 0, result.x
+
+
+class MeritOrderBackend(SolverBackend):
+    """
+    Closed-form solve for models in merit-order form (see
+    RMOMatrixModel.is_merit_order_form). Per block, negative-price units run
+    at their bound and the remaining demand is filled cheapest first, which
+    is exactly the LP optimum. All blocks are handled with one sort and
+    cumsum over the (plants x time blocks) grid.
+    """
+    name = 'merit_order'
+    
+    def __init__(self, threads=0, time_limit=None, mip_gap=None):
+        super().__init__(threads, time_limit, mip_gap)
+        self.threads = 1
+    
+    def solve_matrix(self, matrix, basis=None):
+        if not matrix.is_merit_order_form():
+            raise Exception("Model is not in merit-order form")
+        
+        cost = matrix.c.reshape(matrix.shape)
+        upper = matrix.upper.reshape(matrix.shape)
+        demand = np.zeros(matrix.shape[1])
+        demand[matrix.blocks] = matrix.row_lower
+        
+        # Negative prices lower the cost at any output, so run them at the bound
+        negative = cost < 0
+        if np.any(negative & np.isinf(upper)):
+            return False, None
+        x = np.where(negative, upper, 0.0)
+        remaining = np.maximum(demand - x.sum(axis=0), 0.0)
+        
+        # Fill what is left cheapest first; negative units sort last with no room
+        order = np.argsort(np.where(negative, np.inf, cost), axis=0, kind='stable')
+        room = np.take_along_axis(np.where(negative, 0.0, upper), order, axis=0)
+        filled_before = np.vstack([np.zeros((1, matrix.shape[1])), np.cumsum(room, axis=0)[:-1]])
+        dispatch = np.clip(remaining - filled_before, 0.0, room)
+        
+        if np.any(room.sum(axis=0) < remaining):
+            return False, None
+        
+        # Back from price order to plant order
+        np.put_along_axis(room, order, dispatch, axis=0)
+        return True, (x + room).ravel()
+
+
+SOLVER_BACKENDS = {
+    'cbc': CBCBackend,
+    'highs': HighsBackend,
+    'scipy': ScipyBackend
+}
+
+
+def make_solver_backend(options):
+    """Create the solver backend selected in the runner options"""
+    name = options['solver']
+    if name not in SOLVER_BACKENDS:
+        raise Exception(f"Unknown solver backend: {name}")
+    return SOLVER_BACKENDS[name](
+        threads=options['threads'],
+        time_limit=options['time_limit'],
+        mip_gap=options['mip_gap']
+    )
+
+
+def is_plain_string_column(series):
+    """True for object or string dtype columns that are not categorical yet"""
+    return not isinstance(series.dtype, pd.CategoricalDtype) and (
+        pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+    )
+
+
+def parse_time_strings(series, time_format):
+    """
+    Parse date strings with a pandas format, coercing failures to NaT.
+    Strings with a UTC offset ('Z', '+05:30') are converted to UTC and
+    every result is naive, so offset and plain strings share one dtype.
+    """
+    return pd.to_datetime(series, format=time_format, errors='coerce', utc=True).dt.tz_convert(None)
+
+
+def detect_time_format(series):
+    """
+    Detect the format of a timeperiod column from a sample of its values:
+    'serial', 'datetime', 'iso', 'mixed' (serials and strings) or 'other'.
+    None when the column holds no values.
+    """
+    sample = series.dropna().head(TIME_FORMAT_SAMPLE)
+    if len(sample) == 0:
+        return None
+    
+    numbers = pd.to_numeric(sample, errors='coerce')
+    if numbers.notna().all():
+        return 'serial'
+    if numbers.notna().any():
+        return 'mixed'
+    for name in ('datetime', 'iso'):
+        if parse_time_strings(sample, TIME_FORMATS[name]).notna().all():
+            return name
+    return 'other'
+
+
+def parse_time_periods(series, time_format):
+    """
+    Convert a timeperiod column in one vectorized call for its format.
+    
+    A 'mixed' column is split: serial rows convert as Excel days and the
+    rest as ISO strings. Rows that do not fit the given format go through
+    the mixed split, and only what that leaves falls back to per-element
+    parsing. Returns (datetimes, format), with the format widened to
+    'mixed' when rows did not fit.
+    """
+    if time_format == 'serial':
+        parsed = pd.to_datetime(pd.to_numeric(series, errors='coerce'), unit='D', origin=EXCEL_EPOCH)
+    elif time_format in ('datetime', 'iso'):
+        parsed = parse_time_strings(series, TIME_FORMATS[time_format])
+    elif time_format == 'mixed':
+        numbers = pd.to_numeric(series, errors='coerce')
+        is_serial = numbers.notna()
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        parsed[is_serial] = pd.to_datetime(numbers[is_serial], unit='D', origin=EXCEL_EPOCH)
+        parsed[~is_serial] = parse_time_strings(series[~is_serial], 'ISO8601')
+    else:
+        return parse_time_strings(series, 'mixed'), time_format
+    
+    missed = parsed.isna() & series.notna()
+    if missed.any():
+        if time_format == 'mixed':
+            parsed[missed] = parse_time_strings(series[missed], 'mixed')
+        else:
+            parsed[missed], _ = parse_time_periods(series[missed], 'mixed')
+            time_format = 'mixed'
+    return parsed, time_format
+
+
+def sqlite_values(series):
+    """
+    A result column as a list of native Python values SQLite can bind.
+    Datetimes become text the way sqlite3's default adapter writes them,
+    missing values become None.
+    """
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        fractional = (series.dt.microsecond != 0).to_numpy()
+        if fractional.any():
+            text[fractional] = series[fractional].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        values = text.to_numpy(dtype=object, copy=True)
+    elif pd.api.types.is_float_dtype(series):
+        return series.to_numpy(dtype=float).tolist()
+    else:
+        values = series.to_numpy(dtype=object, copy=True)
+    values[missing] = None
+    return values.tolist()
+
+
+def time_block_keys(values):
+    """
+    Time blocks as an Index of text keys that compare equal however the
+    block was stored. OptimizationResult.time_block is an INTEGER column,
+    so a '11' read from an uploaded TEXT column comes back as 11; integral
+    numbers and numeric strings both key as '11', anything else as str().
+    """
+    keys = pd.Series(np.asarray(values, dtype=object))
+    numbers = pd.to_numeric(keys, errors='coerce')
+    integral = (numbers.notna() & (numbers % 1 == 0)).to_numpy()
+    text = keys.astype(str).to_numpy(dtype=object, copy=True)
+    text[integral] = numbers[integral].astype(np.int64).astype(str).to_numpy()
+    return pd.Index(text)
+
+
+_model_id_lock = threading.Lock()
+_last_model_id = [None, 0]
+
+
+def new_model_id():
+    """
+    Timestamped model id, suffixed with a counter when this process already
+    issued one in the same second (e.g. back-to-back worker jobs).
+    """
+    base = f"RMO_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    with _model_id_lock:
+        if _last_model_id[0] == base:
+            _last_model_id[1] += 1
+            return f"{base}_{_last_model_id[1]}"
+        _last_model_id[0] = base
+        _last_model_id[1] = 1
+        return base
+
+
+def slice_blocks(arrays, blocks):
+    """Restrict the model arrays to the given time block positions"""
+    return {
+        key: values[blocks] if values.ndim == 1 else values[:, blocks]
+        for key, values in arrays.items()
+    }
+
+
+def process_pool_context():
+    """
+    Start method for solver process pools. Forking is cheapest and safe
+    while this is the only thread, as in a single CLI run. Batch runs
+    solve from worker threads next to the writer thread and shared-
+    connection lock, and forking a multithreaded process can deadlock the
+    child, so then children start from a fork server (or are spawned
+    where there is none).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if threading.active_count() == 1 and 'fork' in methods:
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def solve_block_chunk(task):
+    """Process pool worker: solve the sub-model of one chunk of time blocks"""
+    arrays, backend, initial = task
+    matrix = RMOMatrixModel(arrays)
+    optimal, objective_value, values = matrix.solve(backend, initial)
+    return optimal, objective_value, values, matrix.warm_started
+
+
+class SharedConnection:
+    """
+    One SQLite connection shared by the concurrent runs of a batch. A run
+    holds it from connect_db() until close_db(), so one run's reads and
+    write transaction never interleave with another's.
+    """
+    
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+    
+    def acquire(self):
+        self.lock.acquire()
+        return self.conn
+    
+    def release(self):
+        self.lock.release()
+    
+    def close(self):
+        self.conn.close()
+
 
 class RMOOptimizer:
-    def __init__(self, db_path, data_source_id):
+    def __init__(self, db_path, data_source_id, options=None, shared_connection=None):
         self.db_path = db_path
         self.data_source_id = data_source_id
-        self.model_id = f"RMO_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.option_overrides = options or {}
+        self.options = {**DEFAULT_OPTIONS, **self.option_overrides}
+        self.shared_connection = shared_connection
+        self.write_connection = None
+        self.model_id = new_model_id()
         self.model_trigger_time = datetime.now()
         
-    def connect_db(self):
-        """Connect to SQLite database"""
+    def connect_db(self, write=False):
+        """
+        Connect to SQLite database, or take the batch's shared connection
+        (the result writer's connection when writing from it)
+        """
+        shared = self.write_connection if write and self.write_connection is not None else self.shared_connection
+        if shared is not None:
+            return shared.acquire()
         return sqlite3.connect(self.db_path)
     
+    def close_db(self, conn, write=False):
+        """Close a connection from connect_db, or hand back the shared one"""
+        shared = self.write_connection if write and self.write_connection is not None else self.shared_connection
+        if shared is not None:
+            shared.release()
+        else:
+            conn.close()
+    
     def read_data(self):
         """Read data from data source table"""
         conn = self.connect_db()
         
         try:
-            # Get data source config
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT config FROM DataSource WHERE id = ?
-            """, (self.data_source_id,))
-            
-            result = cursor.fetchone()
-            if not result:
-                raise Exception(f"Data source {self.data_source_id} not found")
-            
-            config = json.loads(result[0])
-            table_name = config.get('tableName')
-            
-            if not table_name:
-                raise Exception("Table name not found in data source config")
-            
-            # Read data from table
-            query = f'SELECT * FROM "{table_name}"'
-            df = pd.read_sql(query, conn)
+            # Read only the model columns, within the horizon if one is set
+            query, params = self.source_query(conn)
+            df = pd.read_sql(query, conn, params=params)
             
             # Convert column names to lowercase for easier access
             df.columns = df.columns.str.lower()
@@ -61,214 +789,1236 @@ class RMOOptimizer:
             return df
             
         finally:
-            conn.close()
+            self.close_db(conn)
+    
+    def read_cells(self):
+        """
+        Read, prepare and aggregate the data source into model cells.
+        
+        With the 'chunk_size' option the table is streamed that many rows
+        at a time: each chunk is prepared and folded into the per-cell
+        aggregates before the next one is fetched, so memory follows the
+        chunk size and the number of (plant, time block) cells instead of
+        the raw table. Without it the table is read in one go.
+        
+        Returns (cells, block_hashes); block_hashes is only collected for
+        incremental runs.
+        """
+        conn = self.connect_db()
+        
+        try:
+            query, params = self.source_query(conn)
+            chunk_size = self.options['chunk_size']
+            if chunk_size:
+                chunks = pd.read_sql(query, conn, params=params, chunksize=int(chunk_size))
+            else:
+                chunks = [pd.read_sql(query, conn, params=params)]
+            
+            merged = None
+            pending = []
+            hashes = None
+            offset = 0
+            for chunk in chunks:
+                chunk.columns = chunk.columns.str.lower()
+                chunk = self.prepare_data(chunk)
+                cells = self.aggregate_cells(chunk, row_offset=offset)
+                offset += len(chunk)
+                if len(cells) == 0:
+                    continue
+                
+                if self.options['incremental']:
+                    block_hashes = self.hash_blocks(chunk)
+                    hashes = block_hashes if hashes is None else self.merge_block_hashes([hashes, block_hashes])
+                
+                # Fold pending chunks in once they outgrow the merged cells,
+                # which keeps re-merging linear in the number of cells
+                pending.append(cells)
+                if merged is None or sum(len(part) for part in pending) >= len(merged):
+                    merged = self.merge_cells(([] if merged is None else [merged]) + pending)
+                    pending = []
+            
+            if merged is None:
+                return pd.DataFrame(columns=CELL_KEYS), None
+            if pending:
+                merged = self.merge_cells([merged] + pending)
+            return self.unify_time_blocks(merged, hashes)
+            
+        finally:
+            self.close_db(conn)
+    
+    def unify_time_blocks(self, cells, block_hashes=None):
+        """
+        Give every time block one key type across chunks. compact_frame
+        decides the timeblock dtype per chunk: integers where a chunk is all
+        integral, strings where it has a blank or non-integer value. Mixed
+        keys would split one block into 11 and '11', so then integers are
+        keyed as text and the cells (and block hashes) of each block are
+        merged again.
+        """
+        keys = cells['timeblock']
+        if not (pd.api.types.is_object_dtype(keys) and pd.api.types.infer_dtype(keys, skipna=True) == 'mixed-integer'):
+            return cells, block_hashes
+        
+        def text_key(value):
+            return str(int(value)) if isinstance(value, (int, np.integer)) else value
+        
+        cells = cells.assign(timeblock=keys.map(text_key))
+        cells = self.merge_cells([cells])
+        if block_hashes is not None:
+            block_hashes.index = block_hashes.index.map(text_key)
+            block_hashes = self.merge_block_hashes([block_hashes])
+        return cells, block_hashes
+    
+    def source_query(self, conn):
+        """
+        Look up the data source config, apply its optimization options and
+        return the (query, params) that read its table.
+        """
+        # Get data source config
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT config FROM DataSource WHERE id = ?
+        """, (self.data_source_id,))
+        
+        result = cursor.fetchone()
+        if not result:
+            raise Exception(f"Data source {self.data_source_id} not found")
+        
+        config = json.loads(result[0])
+        table_name = config.get('tableName')
+        self.options = {**DEFAULT_OPTIONS, **config.get('optimization', {}), **self.option_overrides}
+        
+        if not table_name:
+            raise Exception("Table name not found in data source config")
+        
+        return self.build_read_query(conn, table_name)
+    
+    def build_read_query(self, conn, table_name):
+        """
+        Build the data query: project the table onto MODEL_COLUMNS and push
+        the 'horizon_start' / 'horizon_end' options (end exclusive) down as
+        a WHERE clause on timeperiod.
+        
+        Uploaded tables keep every value as TEXT, so timeperiod holds Excel
+        serial days or date strings, possibly mixed; each row is compared
+        in its own representation. Date strings go through SQLite's
+        datetime(), which supports 'YYYY-MM-DD' (as midnight) and
+        'YYYY-MM-DD HH:MM[:SS[.SSS]]' with a space or 'T', applying any UTC
+        offset and truncating to whole seconds; other strings are compared
+        as text.
+        """
+        cursor = conn.cursor()
+        cursor.execute(f'PRAGMA table_info("{table_name}")')
+        table_columns = {row[1].lower(): row[1] for row in cursor.fetchall()}
+        
+        selected = [table_columns[column] for column in MODEL_COLUMNS if column in table_columns]
+        select_list = ', '.join('"{}"'.format(column.replace('"', '""')) for column in selected) or '*'
+        query = f'SELECT {select_list} FROM "{table_name}"'
+        params = []
+        
+        start, end = self.options['horizon_start'], self.options['horizon_end']
+        if start is None and end is None:
+            return query, params
+        if 'timeperiod' not in table_columns:
+            raise Exception("Horizon filter needs a timeperiod column")
+        
+        column = '"{}"'.format(table_columns['timeperiod'].replace('"', '""'))
+        conditions = []
+        for bound, operator in ((start, '>='), (end, '<')):
+            if bound is None:
+                continue
+            bound = pd.Timestamp(bound)
+            # Nudged down so float serials that land on the bound count as equal
+            serial_day = (bound - EXCEL_EPOCH) / pd.Timedelta(days=1) - 1e-9
+            # Date strings compare as normalised datetimes, serials as numbers
+            conditions.append(f"""
+                CASE WHEN {column} GLOB '*[^0-9.]*'
+                     THEN coalesce(datetime({column}), replace({column}, 'T', ' ')) {operator} ?
+                     ELSE CAST({column} AS REAL) {operator} ?
+                END
+            """)
+            params += [bound.strftime('%Y-%m-%d %H:%M:%S'), serial_day]
+        
+        query += ' WHERE ' + ' AND '.join(conditions)
+        return query, params
     
     def prepare_data(self, df):
         """Prepare data for optimization"""
         # Convert numeric columns
-        numeric_cols = ['damprice', 'gdamprice', 'rtmprice', 'scheduledmw', 'modelresultsmw']
-        for col in numeric_cols:
+        for col in NUMERIC_COLUMNS:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
         
-        # Convert timeperiod to datetime if needed
+        # Convert timeperiod to datetime, with the format detected once per
+        # data source (Excel serial days, date strings, or both)
         if 'timeperiod' in df.columns:
-            # Excel serial date to datetime
-            try:
-                df['timeperiod'] = pd.to_datetime(df['timeperiod'], unit='D', origin='1899-12-30')
-            except:
-                df['timeperiod'] = pd.to_datetime(df['timeperiod'], errors='coerce')
+            cache_key = (self.db_path, self.data_source_id)
+            time_format = _time_format_cache.get(cache_key) or detect_time_format(df['timeperiod'])
+            df['timeperiod'], time_format = parse_time_periods(df['timeperiod'], time_format)
+            if time_format is not None:
+                _time_format_cache[cache_key] = time_format
+        
+        if self.options['compact_dtypes']:
+            df = self.compact_frame(df)
         
         return df
     
-    def run_optimization(self, df):
+    def compact_frame(self, df):
         """
-        Run optimization model using PuLP
-        Objective: Minimize cost while meeting demand
+        Shrink the prepared frame without changing any value: repeated
+        strings become categoricals (categories in order of appearance, so
+        unique() order is unchanged), numeric columns become float32 where
+        that round-trips exactly, and timeblock gets the smallest integer
+        type that holds it.
         """
-        start_time = datetime.now()
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns and is_plain_string_column(df[col]):
+                codes, uniques = pd.factorize(df[col], sort=False)
+                df[col] = pd.Categorical.from_codes(codes, categories=uniques)
         
-        # Create model
-        model = LpProblem("RMO_Optimization", LpMinimize)
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns and df[col].dtype == np.float64:
+                compact = df[col].astype(np.float32)
+                if np.array_equal(compact.to_numpy(dtype=np.float64), df[col].to_numpy()):
+                    df[col] = compact
         
-        # Get unique plants and time blocks
-        plants = df['plantname'].unique() if 'plantname' in df.columns else []
-        time_blocks = df['timeblock'].unique() if 'timeblock' in df.columns else []
+        if 'timeblock' in df.columns:
+            timeblock = pd.to_numeric(df['timeblock'], errors='coerce')
+            if timeblock.notna().all() and (timeblock % 1 == 0).all():
+                df['timeblock'] = pd.to_numeric(timeblock.astype(np.int64), downcast='integer')
+            elif is_plain_string_column(df['timeblock']):
+                codes, uniques = pd.factorize(df['timeblock'], sort=False)
+                df['timeblock'] = pd.Categorical.from_codes(codes, categories=uniques)
         
-        if len(plants) == 0 or len(time_blocks) == 0:
-            raise Exception("No plants or time blocks found in data")
+        return df
+    
+    def aggregate_cells(self, df, row_offset=0):
+        """
+        Collapse prepared input rows to one row per (plant, time block)
+        cell, in order of first appearance. A cell keeps its first row's
+        columns and adds the model inputs over all of its rows:
+        
+        price_total: summed DAM price, the cost coefficient
+        scheduled_total: summed ScheduledMW, which feeds the block demand
+        cap: tightest 1.2 * ScheduledMW bound, inf when unbounded
+        row: position of the first input row, counted from row_offset
         
-        # Decision variables: generation for each plant at each time block
+        Cells of consecutive chunks of one table combine with merge_cells.
+        """
+        if not all(column in df.columns for column in CELL_KEYS):
+            return pd.DataFrame(columns=CELL_KEYS)
+        
+        columns = CELL_KEYS + [
+            column for _, column, _ in RESULT_COLUMNS
+            if column in df.columns and column not in CELL_KEYS
+        ]
+        price = df['damprice'].to_numpy(dtype=float) if 'damprice' in df.columns else np.zeros(len(df))
+        scheduled = df['scheduledmw'].to_numpy(dtype=float) if 'scheduledmw' in df.columns else np.zeros(len(df))
+        
+        cells = df[columns].assign(
+            price_total=price,
+            scheduled_total=scheduled,
+            cap=np.where(scheduled > 0, scheduled * 1.2, np.inf),
+            row=np.arange(row_offset, row_offset + len(df))
+        )
+        return self.merge_cells([cells])
+    
+    def merge_cells(self, frames):
+        """
+        Merge cell frames in read order: totals add up, caps take the
+        minimum and the earliest first row supplies the other columns.
+        """
+        cells = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        grouped = cells.groupby(CELL_KEYS, sort=False, dropna=False, observed=True)
+        totals = grouped.agg(
+            price_total=('price_total', 'sum'),
+            scheduled_total=('scheduled_total', 'sum'),
+            cap=('cap', 'min')
+        )
+        first = grouped['row'].idxmin().to_numpy()
+        
+        merged = cells.drop(columns=['price_total', 'scheduled_total', 'cap']).iloc[first].reset_index(drop=True)
+        for column in ('price_total', 'scheduled_total', 'cap'):
+            merged[column] = totals[column].to_numpy()
+        return merged
+    
+    def build_model_arrays(self, cells, plants, time_blocks):
+        """
+        Lay the aggregated cells out as (plants x time blocks) NumPy arrays
+        of LP coefficients.
+        
+        cost: summed DAM price of the cell
+        cap: tightest 1.2 * ScheduledMW bound of the cell, inf when unbounded
+        demand: per time block minimum demand, 0.8 * summed ScheduledMW
+        present: whether the cell has any input rows
+        first_row: position of the cell in cells, -1 when absent
+        """
+        n_plants, n_blocks = len(plants), len(time_blocks)
+        plant_idx = pd.Index(plants).get_indexer(cells['plantname'])
+        tb_idx = pd.Index(time_blocks).get_indexer(cells['timeblock'])
+        valid = (plant_idx >= 0) & (tb_idx >= 0)
+        grid = plant_idx[valid] * n_blocks + tb_idx[valid]
+        
+        cost = np.zeros(n_plants * n_blocks)
+        cap = np.full(n_plants * n_blocks, np.inf)
+        scheduled_total = np.zeros(n_plants * n_blocks)
+        present = np.zeros(n_plants * n_blocks, dtype=bool)
+        first_row = np.full(n_plants * n_blocks, -1)
+        cost[grid] = cells['price_total'].to_numpy(dtype=float)[valid]
+        cap[grid] = cells['cap'].to_numpy(dtype=float)[valid]
+        scheduled_total[grid] = cells['scheduled_total'].to_numpy(dtype=float)[valid]
+        present[grid] = True
+        first_row[grid] = np.flatnonzero(valid)
+        
+        return {
+            'cost': cost.reshape(n_plants, n_blocks),
+            'cap': cap.reshape(n_plants, n_blocks),
+            'demand': scheduled_total.reshape(n_plants, n_blocks).sum(axis=0) * 0.8,
+            'present': present.reshape(n_plants, n_blocks),
+            'first_row': first_row.reshape(n_plants, n_blocks)
+        }
+    
+    def extract_results(self, cells, plants, time_blocks, values, first_row):
+        """
+        Assemble the per-variable results column-wise.
+        
+        values and first_row are (plants x time blocks) arrays; a cell is
+        reported when it has a solution value and at least one input row,
+        using that cell's first-row columns for the descriptive columns.
+        """
+        p_idx, t_idx = np.nonzero(~np.isnan(values) & (first_row >= 0))
+        rows = first_row[p_idx, t_idx]
+        
+        results = pd.DataFrame({
+            'plant': np.asarray(plants, dtype=object)[p_idx],
+            'time_block': np.asarray(time_blocks, dtype=object)[t_idx],
+            'optimized_mw': values[p_idx, t_idx]
+        })
+        for key, column, default in RESULT_COLUMNS:
+            if column in cells.columns:
+                results[key] = cells[column].to_numpy()[rows]
+            else:
+                results[key] = default() if callable(default) else default
+        
+        return results
+    
+    def load_run_values(self, conn, model_id, plants, time_blocks):
+        """
+        Load a stored run's model_results_mw onto the (plants x time blocks)
+        grid. Cells the run did not cover are NaN. Returns (values, matched).
+        
+        Time blocks are matched through time_block_keys, since the stored
+        INTEGER time_block and the uploaded TEXT timeblock differ in type.
+        """
+        previous = pd.read_sql("""
+            SELECT plant_name, time_block, model_results_mw FROM OptimizationResult
+            WHERE data_source_id = ? AND model_id = ?
+        """, conn, params=(self.data_source_id, model_id))
+        
+        plant_idx = pd.Index(plants).get_indexer(previous['plant_name'])
+        tb_idx = time_block_keys(time_blocks).get_indexer(time_block_keys(previous['time_block']))
+        matched = (plant_idx >= 0) & (tb_idx >= 0)
+        
+        values = np.full((len(plants), len(time_blocks)), np.nan)
+        values[plant_idx[matched], tb_idx[matched]] = previous['model_results_mw'].to_numpy(dtype=float)[matched]
+        return values, int(np.count_nonzero(matched))
+    
+    def load_warm_start(self, plants, time_blocks):
+        """
+        Load the latest successful run of this data source as a starting
+        point. Returns ((plants x time blocks) values or None, info), with
+        cells the previous run did not cover left at 0.
+        
+        info['previous_solve_time_ms_delta'] is set by optimize_cells to the
+        previous run's solver_time_ms minus this run's. It is only a
+        comparison with that run, which may have used another backend or
+        other data, not a measured saving from the warm start.
+        """
+        info = {
+            'used': False,
+            'source_model_id': None,
+            'matched_cells': 0,
+            'previous_solve_time_ms': None,
+            'previous_solve_time_ms_delta': None
+        }
+        
+        conn = self.connect_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT model_id, solver_time_ms FROM OptimizationResult
+                WHERE data_source_id = ? AND optimization_status = 'success'
+                ORDER BY model_trigger_time DESC
+                LIMIT 1
+            """, (self.data_source_id,))
+            latest = cursor.fetchone()
+            if not latest:
+                return None, info
+            
+            values, matched = self.load_run_values(conn, latest[0], plants, time_blocks)
+        finally:
+            self.close_db(conn)
+        
+        info['source_model_id'] = latest[0]
+        info['matched_cells'] = matched
+        info['previous_solve_time_ms'] = latest[1]
+        return (np.nan_to_num(values) if matched > 0 else None), info
+    
+    def hash_blocks(self, df):
+        """
+        Sum row hashes over the model and result columns per time block
+        (mod 2**64), so the result does not depend on row order. Returns a
+        frame of 'hash' and 'rows' indexed by time block.
+        
+        Float columns are hashed as float64, so a compacted chunk hashes
+        the same as the whole table would.
+        """
+        columns = CELL_KEYS + [column for _, column, _ in RESULT_COLUMNS if column not in CELL_KEYS]
+        frame = df[[column for column in columns if column in df.columns]]
+        frame = frame.astype({column: np.float64 for column in frame.columns if frame[column].dtype == np.float32})
+        row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        
+        return pd.DataFrame({
+            'timeblock': df['timeblock'].to_numpy(),
+            'hash': row_hashes,
+            'rows': np.ones(len(df), dtype=np.int64)
+        }).groupby('timeblock', sort=False, dropna=False).sum()
+    
+    def merge_block_hashes(self, frames):
+        """Add up hash_blocks frames of separate chunks (mod 2**64)"""
+        return pd.concat(frames).groupby(level=0, sort=False, dropna=False).sum()
+    
+    def fingerprint_blocks(self, block_hashes, plants, time_blocks):
+        """
+        Fingerprint the input rows of every time block from its row count
+        and hash sum. Every block's variables also depend on the plant set,
+        which is stored under the '*' key.
+        """
+        tb_idx = pd.Index(time_blocks).get_indexer(block_hashes.index)
+        valid = tb_idx >= 0
+        sums = np.zeros(len(time_blocks), dtype=np.uint64)
+        counts = np.zeros(len(time_blocks), dtype=np.int64)
+        np.add.at(sums, tb_idx[valid], block_hashes['hash'].to_numpy(dtype=np.uint64)[valid])
+        np.add.at(counts, tb_idx[valid], block_hashes['rows'].to_numpy()[valid])
+        
+        fingerprints = {
+            str(tb): f"{count}:{block_hash:016x}"
+            for tb, count, block_hash in zip(time_blocks, counts.tolist(), sums.tolist())
+        }
+        plant_names = '\x1f'.join(sorted(str(plant) for plant in plants))
+        fingerprints['*'] = hashlib.sha1(plant_names.encode('utf-8')).hexdigest()
+        return fingerprints
+    
+    def load_incremental_base(self, fingerprints, plants, time_blocks):
+        """
+        Compare block fingerprints with the latest fingerprinted run of this
+        data source. Returns (values or None, info): values holds the
+        previous run's results for the grid, and info['changed'] flags the
+        blocks that must be re-solved. None means a full solve is needed.
+        """
+        info = {'previous_model_id': None, 'changed_blocks': len(time_blocks), 'reused_blocks': 0}
+        
+        conn = self.connect_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'OptimizationBlockFingerprint'
+            """)
+            if not cursor.fetchone():
+                return None, info
+            
+            cursor.execute("""
+                SELECT model_id FROM OptimizationBlockFingerprint
+                WHERE data_source_id = ?
+                ORDER BY created_at DESC, rowid DESC
+                LIMIT 1
+            """, (self.data_source_id,))
+            latest = cursor.fetchone()
+            if not latest:
+                return None, info
+            
+            cursor.execute("""
+                SELECT time_block, fingerprint FROM OptimizationBlockFingerprint
+                WHERE data_source_id = ? AND model_id = ?
+            """, (self.data_source_id, latest[0]))
+            previous = dict(cursor.fetchall())
+            
+            info['previous_model_id'] = latest[0]
+            if previous.get('*') != fingerprints['*']:
+                # A different plant set changes every block's model
+                return None, info
+            
+            values, _ = self.load_run_values(conn, latest[0], plants, time_blocks)
+        finally:
+            self.close_db(conn)
+        
+        changed = np.array([previous.get(str(tb)) != fingerprints[str(tb)] for tb in time_blocks])
+        info['changed'] = changed
+        info['changed_blocks'] = int(np.count_nonzero(changed))
+        info['reused_blocks'] = len(time_blocks) - info['changed_blocks']
+        return values, info
+    
+    def solve_pulp(self, arrays, plants, time_blocks, backend):
+        """
+        Build and solve the model through PuLP expression objects.
+        Kept as the reference mode for cross-checking the matrix builder.
+        
+        Returns (optimal, objective_value, values) with values shaped
+        (plants x time blocks).
+        """
+        cost = arrays['cost']
+        cap = arrays['cap']
+        
+        # Create model
+        model = LpProblem("RMO_Optimization", LpMinimize)
+        
+        # Decision variables: generation for each plant at each time block,
+        # keyed by (plant, time block) grid position
         gen_vars = {}
-        for plant in plants:
-            for tb in time_blocks:
+        for p, plant in enumerate(plants):
+            for t, tb in enumerate(time_blocks):
                 var_name = f"gen_{plant}_{tb}"
-                gen_vars[(plant, tb)] = LpVariable(var_name, lowBound=0, cat='Continuous')
+                gen_vars[(p, t)] = LpVariable(var_name, lowBound=0, cat='Continuous')
         
         # Objective function: Minimize total cost
         # Using DAM price as the cost coefficient
-        obj = []
-        for idx, row in df.iterrows():
-            plant = row.get('plantname')
-            tb = row.get('timeblock')
-            price = row.get('damprice', 0)
-            
-            if (plant, tb) in gen_vars:
-                obj.append(price * gen_vars[(plant, tb)])
-        
-        model += lpSum(obj), "Total_Cost"
+        p_idx, t_idx = np.nonzero(arrays['present'])
+        model += LpAffineExpression(
+            (gen_vars[(p, t)], cost[p, t]) for p, t in zip(p_idx.tolist(), t_idx.tolist())
+        ), "Total_Cost"
         
         # Constraints
         # 1. Capacity constraints (if ScheduledMW represents capacity)
-        for idx, row in df.iterrows():
-            plant = row.get('plantname')
-            tb = row.get('timeblock')
-            scheduled = row.get('scheduledmw', 0)
-            
-            if (plant, tb) in gen_vars and scheduled > 0:
-                model += gen_vars[(plant, tb)] <= scheduled * 1.2, f"Cap_{plant}_{tb}"
+        p_idx, t_idx = np.nonzero(np.isfinite(cap))
+        for p, t in zip(p_idx.tolist(), t_idx.tolist()):
+            model += gen_vars[(p, t)] <= cap[p, t], f"Cap_{plants[p]}_{time_blocks[t]}"
         
         # 2. Demand constraint (simplified - sum must meet minimum demand)
         # This is a placeholder - adjust based on actual requirements
-        for tb in time_blocks:
-            tb_data = df[df['timeblock'] == tb] if 'timeblock' in df.columns else df
-            min_demand = tb_data['scheduledmw'].sum() if 'scheduledmw' in tb_data.columns else 0
-            
-            if min_demand > 0:
-                model += lpSum([gen_vars[(p, tb)] for p in plants if (p, tb) in gen_vars]) >= min_demand * 0.8, f"Demand_{tb}"
+        # Every plant has a variable in every block, so block t's members are
+        # column t of the (plants x time blocks) variable grid
+        var_grid = list(gen_vars.values())
+        demand = arrays['demand']
+        for t in np.flatnonzero(demand > 0):
+            members = var_grid[t::len(time_blocks)]
+            model += LpAffineExpression((var, 1) for var in members) >= demand[t], f"Demand_{time_blocks[t]}"
         
         # Solve
-        solver = PULP_CBC_CMD(msg=0)  # Silent solver
-        status = model.solve(solver)
+        with backend.solve_scope():
+            status = model.solve(backend.pulp_solver())
+        
+        values = np.array(
+            [np.nan if var.varValue is None else var.varValue for var in var_grid]
+        ).reshape(len(plants), len(time_blocks))
+        optimal = status == LpStatusOptimal
+        
+        return optimal, value(model.objective) if optimal else None, values
+    
+    def solve_decomposed(self, arrays, backend, initial=None):
+        """
+        Solve the matrix model as independent per-time-block sub-problems.
+        
+        Demand rows are the only constraints and each one covers a single
+        block, so the blocks can be solved separately and merged. Blocks are
+        chunked over a process pool with one single-threaded solver each;
+        a model that is not block separable is solved whole.
+        
+        Returns (optimal, objective_value, values, info).
+        """
+        matrix = RMOMatrixModel(arrays)
+        if not matrix.is_block_separable():
+            optimal, objective_value, values = matrix.solve(backend, initial)
+            info = {'sub_problems': 1, 'workers': 1, 'warm_started': int(matrix.warm_started)}
+            return optimal, objective_value, values, info
+        
+        n_blocks = arrays['cost'].shape[1]
+        workers = min(self.options['workers'] or os.cpu_count() or 1, n_blocks)
+        # A few chunks per worker keeps the pool busy when block sizes vary
+        chunks = np.array_split(np.arange(n_blocks), min(workers * 4, n_blocks))
+        sub_backend = type(backend)(threads=1, time_limit=backend.time_limit, mip_gap=backend.mip_gap)
+        tasks = [
+            (slice_blocks(arrays, chunk), sub_backend, None if initial is None else initial[:, chunk])
+            for chunk in chunks
+        ]
+        
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context()) as pool:
+                outcomes = list(pool.map(solve_block_chunk, tasks))
+        else:
+            outcomes = [solve_block_chunk(task) for task in tasks]
+        
+        values = np.full(arrays['cost'].shape, np.nan)
+        optimal = True
+        objective_value = 0.0
+        warm_started = 0
+        for chunk, (chunk_optimal, chunk_objective, chunk_values, chunk_warm) in zip(chunks, outcomes):
+            values[:, chunk] = chunk_values
+            optimal = optimal and chunk_optimal
+            objective_value += chunk_objective or 0.0
+            warm_started += int(chunk_warm)
+        
+        info = {'sub_problems': len(chunks), 'workers': workers, 'warm_started': warm_started}
+        return optimal, objective_value if optimal else None, values, info
+    
+    def solve_model(self, arrays, plants, time_blocks):
+        """
+        Solve model arrays with the configured builder and backend.
+        
+        The model is built in matrix form by default; set the
+        'model_builder' option to 'pulp' for the PuLP reference build.
+        With 'decompose' the matrix model is solved block by block in
+        parallel. A matrix model with only per-block demand rows is solved
+        in closed form by merit order unless 'merit_order' is disabled.
+        
+        Returns (optimal, objective_value, values, details) where details
+        holds the solver settings and any decomposition or warm start info.
+        """
+        backend = make_solver_backend(self.options)
+        builder = self.options['model_builder']
+        details = {}
+        if self.options['decompose'] and builder != 'matrix':
+            raise Exception("Decomposition requires the matrix model builder")
+        
+        if builder == 'pulp':
+            optimal, objective_value, values = self.solve_pulp(arrays, plants, time_blocks, backend)
+        elif builder == 'matrix':
+            matrix = RMOMatrixModel(arrays)
+            if self.options['merit_order'] and matrix.is_merit_order_form():
+                # Merit order is exact here, so skip the LP solver entirely
+                backend = MeritOrderBackend()
+                optimal, objective_value, values = matrix.solve(backend)
+            else:
+                initial = None
+                if self.options['warm_start'] and backend.supports_warm_start:
+                    initial, details['warm_start'] = self.load_warm_start(plants, time_blocks)
+                
+                if self.options['decompose']:
+                    optimal, objective_value, values, details['decomposition'] = \
+                        self.solve_decomposed(arrays, backend, initial)
+                    warm_started = details['decomposition']['warm_started'] > 0
+                else:
+                    optimal, objective_value, values = matrix.solve(backend, initial)
+                    warm_started = matrix.warm_started
+                
+                if 'warm_start' in details:
+                    details['warm_start']['used'] = warm_started
+        else:
+            raise Exception(f"Unknown model builder: {builder}")
+        
+        details['solver'] = backend.describe()
+        return optimal, objective_value, values, details
+    
+    def run_optimization(self, df):
+        """Run optimization on a prepared input frame (see optimize_cells)"""
+        cells = self.aggregate_cells(df)
+        block_hashes = self.hash_blocks(df) if self.options['incremental'] and len(cells) > 0 else None
+        return self.optimize_cells(cells, block_hashes)
+    
+    def optimize_cells(self, cells, block_hashes=None):
+        """
+        Run optimization model
+        Objective: Minimize cost while meeting demand
+        
+        With 'incremental' only the time blocks whose input fingerprint
+        changed since the last run are solved; the rest are copied forward.
+        If the previous run lacks a value for any input cell of an
+        unchanged block, everything is solved again.
+        'cross_check' also solves the PuLP reference model and reports its
+        objective.
+        """
+        start_time = datetime.now()
+        
+        # Get unique plants and time blocks
+        plants = cells['plantname'].unique()
+        time_blocks = cells['timeblock'].unique()
+        
+        if len(plants) == 0 or len(time_blocks) == 0:
+            raise Exception("No plants or time blocks found in data")
+        
+        # Coefficient and bound arrays from the (plant, time block) cells
+        arrays = self.build_model_arrays(cells, plants, time_blocks)
+        
+        fingerprints = None
+        base_values = None
+        if self.options['incremental']:
+            fingerprints = self.fingerprint_blocks(block_hashes, plants, time_blocks)
+            base_values, incremental = self.load_incremental_base(fingerprints, plants, time_blocks)
+            if base_values is not None:
+                # Every input cell of a reused block needs a previous value,
+                # otherwise the run would silently lose those results
+                reused = ~incremental['changed']
+                missing = arrays['present'][:, reused] & np.isnan(base_values[:, reused])
+                if missing.any():
+                    base_values = None
+                    incremental.pop('changed')
+                    incremental.update(changed_blocks=len(time_blocks), reused_blocks=0,
+                                       missing_cells=int(np.count_nonzero(missing)))
+        
+        if base_values is None:
+            optimal, objective_value, values, details = self.solve_model(arrays, plants, time_blocks)
+        else:
+            # Re-solve the changed blocks only; the others keep their values
+            changed = np.flatnonzero(incremental.pop('changed'))
+            values = base_values
+            optimal = True
+            details = {'solver': make_solver_backend(self.options).describe()}
+            if len(changed) > 0:
+                optimal, _, changed_values, details = self.solve_model(
+                    slice_blocks(arrays, changed), plants, time_blocks[changed]
+                )
+                values[:, changed] = changed_values
+            objective_value = float(np.nansum(arrays['cost'] * values)) if optimal else None
+        if fingerprints is not None:
+            details['incremental'] = incremental
         
         # Calculate solve time
         solve_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
         
+        warm_start = details.get('warm_start')
+        if warm_start is not None and warm_start['used'] and warm_start['previous_solve_time_ms'] is not None:
+            warm_start['previous_solve_time_ms_delta'] = warm_start['previous_solve_time_ms'] - solve_time_ms
+        
         # Extract results
-        results = []
-        for (plant, tb), var in gen_vars.items():
-            if var.varValue is not None:
-                # Find original row data
-                row_data = df[(df['plantname'] == plant) & (df['timeblock'] == tb)]
-                if not row_data.empty:
-                    row = row_data.iloc[0]
-                    results.append({
-                        'plant': plant,
-                        'time_block': tb,
-                        'optimized_mw': var.varValue,
-                        'scheduled_mw': row.get('scheduledmw', 0),
-                        'dam_price': row.get('damprice', 0),
-                        'gdam_price': row.get('gdamprice', 0),
-                        'rtm_price': row.get('rtmprice', 0),
-                        'technology_type': row.get('technologytype', ''),
-                        'region': row.get('region', ''),
-                        'state': row.get('state', ''),
-                        'contract_type': row.get('contracttype', ''),
-                        'contract_name': row.get('contractname', ''),
-                        'time_period': row.get('timeperiod', datetime.now())
-                    })
+        results = self.extract_results(cells, plants, time_blocks, values, arrays['first_row'])
         
-        return {
-            'status': 'success' if status == LpStatusOptimal else 'failed',
-            'objective_value': value(model.objective) if status == LpStatusOptimal else None,
+        output = {
+            'status': 'success' if optimal else 'failed',
+            'objective_value': objective_value,
             'solve_time_ms': solve_time_ms,
-            'results': results
+            'results': results,
+            **details
         }
+        if fingerprints is not None:
+            output['fingerprints'] = fingerprints
+        
+        if self.options['cross_check'] and self.options['model_builder'] != 'pulp':
+            _, reference_value, _ = self.solve_pulp(arrays, plants, time_blocks, CBCBackend())
+            output['reference_objective_value'] = reference_value
+        
+        return output
     
     def save_results(self, optimization_result):
-        """Save optimization results to database"""
-        conn = self.connect_db()
+        """
+        Save optimization results to database.
+        
+        With 'staged_write' the rows are first written to a TEMP table,
+        which only this connection sees and which takes no lock on the
+        database file. The run is then published by a single INSERT ...
+        SELECT transaction, so dashboard readers see either the previous
+        runs or the complete new one and the write lock is held only for
+        the copy.
+        
+        Returns the write stats: rows, time in ms and rows per second, plus
+        the publish time in ms for staged writes.
+        """
+        start_time = datetime.now()
+        columns = ', '.join(RESULT_TABLE_COLUMNS)
+        stage = None
+        publish_time_ms = None
+        
+        conn = self.connect_db(write=True)
         cursor = conn.cursor()
         
         try:
-            for result in optimization_result['results']:
-                cursor.execute("""
-                    INSERT INTO OptimizationResult (
-                        id, data_source_id, model_id, model_trigger_time,
-                        time_period, time_block, technology_type, region, state,
-                        contract_type, plant_name, contract_name,
-                        dam_price, gdam_price, rtm_price,
-                        scheduled_mw, model_results_mw,
-                        optimization_status, solver_time_ms, objective_value,
-                        created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    f"opt_{self.model_id}_{result['plant']}_{result['time_block']}",
-                    self.data_source_id,
-                    self.model_id,
-                    self.model_trigger_time,
-                    result['time_period'],
-                    result['time_block'],
-                    result['technology_type'],
-                    result['region'],
-                    result['state'],
-                    result['contract_type'],
-                    result['plant'],
-                    result['contract_name'],
-                    result['dam_price'],
-                    result['gdam_price'],
-                    result['rtm_price'],
-                    result['scheduled_mw'],
-                    result['optimized_mw'],
-                    optimization_result['status'],
-                    optimization_result['solve_time_ms'],
-                    optimization_result['objective_value'],
-                    datetime.now()
-                ))
+            # WAL lets readers carry on during the write; NORMAL syncs at checkpoints
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            
+            if self.options['staged_write']:
+                stage = f'temp."stage_{self.model_id}"'
+                cursor.execute(f"CREATE TEMP TABLE {stage} AS SELECT {columns} FROM OptimizationResult WHERE 0")
+                self.insert_results(cursor, stage, optimization_result)
+                conn.commit()
+                
+                publish_start = datetime.now()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(f"INSERT INTO OptimizationResult ({columns}) SELECT {columns} FROM {stage}")
+            else:
+                self.insert_results(cursor, 'OptimizationResult', optimization_result)
+            
+            if optimization_result.get('fingerprints') and optimization_result['status'] == 'success':
+                self.save_fingerprints(cursor, optimization_result['fingerprints'])
             
             conn.commit()
-            return True
+            if stage is not None:
+                publish_time_ms = int((datetime.now() - publish_start).total_seconds() * 1000)
             
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            if stage is not None:
+                cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+                conn.commit()
+            self.close_db(conn, write=True)
+        
+        rows = len(optimization_result['results'])
+        write_seconds = (datetime.now() - start_time).total_seconds()
+        write = {
+            'rows': rows,
+            'write_time_ms': int(write_seconds * 1000),
+            'rows_per_sec': round(rows / write_seconds) if write_seconds > 0 else None
+        }
+        if stage is not None:
+            write['publish_time_ms'] = publish_time_ms
+        return write
+    
+    def insert_results(self, cursor, table, optimization_result):
+        """
+        Insert the result rows into table through executemany,
+        'write_batch_size' rows at a time, each batch converted
+        column-wise to native values first.
+        """
+        results = optimization_result['results']
+        batch_size = max(int(self.options['write_batch_size']), 1)
+        trigger_time = self.model_trigger_time.isoformat(' ')
+        placeholders = ', '.join('?' * len(RESULT_TABLE_COLUMNS))
+        
+        for start in range(0, len(results), batch_size):
+            batch = results.iloc[start:start + batch_size]
+            count = len(batch)
+            plants = sqlite_values(batch['plant'])
+            time_blocks = sqlite_values(batch['time_block'])
+            created_at = datetime.now().isoformat(' ')
+            
+            cursor.executemany(f"""
+                INSERT INTO {table} ({', '.join(RESULT_TABLE_COLUMNS)}) VALUES ({placeholders})
+            """, zip(
+                [f"opt_{self.model_id}_{plant}_{tb}" for plant, tb in zip(plants, time_blocks)],
+                [self.data_source_id] * count,
+                [self.model_id] * count,
+                [trigger_time] * count,
+                sqlite_values(batch['time_period']),
+                time_blocks,
+                sqlite_values(batch['technology_type']),
+                sqlite_values(batch['region']),
+                sqlite_values(batch['state']),
+                sqlite_values(batch['contract_type']),
+                plants,
+                sqlite_values(batch['contract_name']),
+                sqlite_values(batch['dam_price']),
+                sqlite_values(batch['gdam_price']),
+                sqlite_values(batch['rtm_price']),
+                sqlite_values(batch['scheduled_mw']),
+                sqlite_values(batch['optimized_mw']),
+                [optimization_result['status']] * count,
+                [optimization_result['solve_time_ms']] * count,
+                [optimization_result['objective_value']] * count,
+                [created_at] * count
+            ))
+    
+    def export_results(self, optimization_result):
+        """
+        Write the run as one columnar file in 'export_dir', named by model
+        id and using the OptimizationResult column names, and record it in
+        that directory's manifest.json. Parquet files are zstd compressed;
+        'arrow' writes an uncompressed Arrow IPC file that readers can
+        memory-map. Returns the manifest entry.
+        """
+        if pyarrow is None:
+            raise Exception("Columnar export requires pyarrow. Run: pip install pyarrow")
+        
+        export_format = self.options['export_format']
+        if export_format not in EXPORT_SUFFIXES:
+            raise Exception(f"Unknown export format: {export_format}")
+        
+        results = optimization_result['results'].rename(
+            columns={'plant': 'plant_name', 'optimized_mw': 'model_results_mw'}
+        ).assign(
+            data_source_id=self.data_source_id,
+            model_id=self.model_id,
+            model_trigger_time=self.model_trigger_time,
+            optimization_status=optimization_result['status'],
+            solver_time_ms=optimization_result['solve_time_ms'],
+            objective_value=optimization_result['objective_value']
+        )
+        columns = [column for column in RESULT_TABLE_COLUMNS if column in results.columns]
+        table = pyarrow.Table.from_pandas(results[columns], preserve_index=False)
+        
+        export_dir = Path(self.options['export_dir'])
+        export_dir.mkdir(parents=True, exist_ok=True)
+        path = export_dir / f"{self.model_id}{EXPORT_SUFFIXES[export_format]}"
+        # Written under a temporary name so readers never see a partial file
+        partial = path.with_name(path.name + '.partial')
+        if export_format == 'parquet':
+            pyarrow.parquet.write_table(table, partial, compression='zstd')
+        else:
+            pyarrow.feather.write_feather(table, partial, compression='uncompressed')
+        os.replace(partial, path)
+        
+        entry = {
+            'model_id': self.model_id,
+            'data_source_id': self.data_source_id,
+            'model_trigger_time': self.model_trigger_time.isoformat(' '),
+            'optimization_status': optimization_result['status'],
+            'objective_value': optimization_result['objective_value'],
+            'file': path.name,
+            'format': export_format,
+            'rows': table.num_rows,
+            'columns': table.column_names,
+            'bytes': path.stat().st_size,
+            'created_at': datetime.now().isoformat(' ')
+        }
+        
+        with _manifest_lock:
+            manifest_path = export_dir / 'manifest.json'
+            manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {'runs': {}}
+            manifest['runs'][self.model_id] = entry
+            partial = manifest_path.with_name('manifest.json.partial')
+            partial.write_text(json.dumps(manifest, indent=2, default=str))
+            os.replace(partial, manifest_path)
+        
+        return entry
+    
+    def save_fingerprints(self, cursor, fingerprints):
+        """Store this run's block fingerprints for later incremental runs"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS OptimizationBlockFingerprint (
+                data_source_id TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                time_block TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (data_source_id, model_id, time_block)
+            )
+        """)
+        cursor.executemany("""
+            INSERT INTO OptimizationBlockFingerprint (data_source_id, model_id, time_block, fingerprint)
+            VALUES (?, ?, ?, ?)
+        """, [(self.data_source_id, self.model_id, tb, fingerprint) for tb, fingerprint in fingerprints.items()])
     
     def run(self):
         """Main execution flow"""
         try:
-            # Read data
-            df = self.read_data()
-            
-            # Prepare data
-            df = self.prepare_data(df)
-            
-            # Run optimization
-            result = self.run_optimization(df)
-            
-            # Save results
-            self.save_results(result)
+            # Read, prepare and optimize
+            result = self.solve()
+        except Exception as e:
+            return self.failure(e)
+        
+        # Save results
+        return self.finish(result)
+    
+    def run_pipelined(self, writer):
+        """
+        Like run(), but queue the save on a ResultWriter and return a
+        Future of the summary, so the calling thread can go on to solve the
+        next run while this one is written.
+        """
+        try:
+            result = self.solve()
+        except Exception as e:
+            summary = Future()
+            summary.set_result(self.failure(e))
+            return summary
+        
+        self.write_connection = writer.connection
+        return writer.submit(self.finish, result)
+    
+    def solve(self):
+        """Read the data, aggregated per (plant, time block) cell, and optimize it"""
+        cells, block_hashes = self.read_cells()
+        if self.options['export_dir'] and pyarrow is None:
+            # Fail before anything is written rather than after the save
+            raise Exception("Columnar export requires pyarrow. Run: pip install pyarrow")
+        return self.optimize_cells(cells, block_hashes)
+    
+    def finish(self, result):
+        """Save an optimization result and summarize the run"""
+        try:
+            write = self.save_results(result)
+            export = self.export_results(result) if self.options['export_dir'] else None
             
-            return {
+            summary = {
                 'success': True,
                 'model_id': self.model_id,
                 'status': result['status'],
                 'objective_value': result['objective_value'],
                 'solve_time_ms': result['solve_time_ms'],
-                'results_count': len(result['results'])
+                'solver': result['solver'],
+                'results_count': len(result['results']),
+                'write': write
             }
+            for key in ('reference_objective_value', 'decomposition', 'warm_start', 'incremental'):
+                if key in result:
+                    summary[key] = result[key]
+            if export is not None:
+                summary['export'] = {key: export[key] for key in ('file', 'format', 'rows', 'bytes')}
+            
+            return summary
             
         except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'model_id': self.model_id
-            }
+            return self.failure(e)
+    
+    def failure(self, error):
+        """Summary of a failed run"""
+        return {
+            'success': False,
+            'error': str(error),
+            'model_id': self.model_id
+        }
+
+
+class ResultWriter:
+    """
+    Single background thread that persists solved runs while the next ones
+    solve. The queue is bounded, so at most `depth` solved results wait in
+    memory and submitters block once the writer falls behind. Calls run in
+    submission order.
+    
+    The writer has its own connection in WAL mode, so its transactions
+    proceed alongside reads on the batch's shared connection.
+    """
+    
+    def __init__(self, db_path, depth=1):
+        self.connection = SharedConnection(db_path)
+        self.connection.conn.execute("PRAGMA journal_mode=WAL")
+        self.queue = queue.Queue(maxsize=max(depth, 1))
+        self.thread = threading.Thread(target=self.drain, name='result-writer', daemon=True)
+        self.thread.start()
+    
+    def submit(self, fn, *args):
+        """Queue fn(*args) on the writer thread; returns a Future of its result"""
+        future = Future()
+        self.queue.put((future, fn, args))
+        return future
+    
+    def drain(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+    
+    def close(self):
+        """Finish the queued writes and stop the thread"""
+        self.queue.put(None)
+        self.thread.join()
+        self.connection.close()
+
+
+def run_job(line):
+    """
+    Run one worker job given as a JSON line:
+    {"db_path": ..., "data_source_id": ..., "options": {...}, "id": ...}
+    "options" and "id" are optional; "id" is echoed back as "job_id".
+    """
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        return {'success': False, 'error': f"Invalid job: {e}"}
+    
+    if not isinstance(job, dict) or 'db_path' not in job or 'data_source_id' not in job:
+        result = {'success': False, 'error': 'Job requires db_path and data_source_id'}
+    elif not isinstance(job.get('options') or {}, dict):
+        result = {'success': False, 'error': 'Job options must be a JSON object'}
+    else:
+        # A job that fails to start must not take the worker down
+        try:
+            optimizer = RMOOptimizer(job['db_path'], job['data_source_id'], job.get('options'))
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        else:
+            result = optimizer.run()
+    
+    if isinstance(job, dict) and 'id' in job:
+        result['job_id'] = job['id']
+    return result
+
+
+def serve_jobs(lines, write):
+    """Run JSON-line jobs until the input ends, writing one JSON result line each"""
+    for line in lines:
+        if line.strip():
+            write(json.dumps(run_job(line), default=str) + '\n')
+
+
+class WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """Serve the JSON-lines job protocol on one socket connection"""
+    
+    # Jobs from concurrent connections run one at a time against SQLite
+    job_lock = threading.Lock()
+    
+    def handle(self):
+        def write(text):
+            self.wfile.write(text.encode('utf-8'))
+            self.wfile.flush()
+        
+        for raw_line in self.rfile:
+            line = raw_line.decode('utf-8')
+            if line.strip():
+                with self.job_lock:
+                    result = run_job(line)
+                write(json.dumps(result, default=str) + '\n')
+
+
+def run_worker(socket_path=None):
+    """
+    Long-lived worker: keeps pandas, NumPy and the solvers loaded and runs
+    jobs from stdin, or from connections on a Unix socket when given.
+    """
+    if socket_path is None:
+        def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        serve_jobs(sys.stdin, write)
+        return
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    # Exit through the finally below so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with socketserver.ThreadingUnixStreamServer(socket_path, WorkerRequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def active_data_source_ids(conn):
+    """Ids of active data sources that have an uploaded table to optimize"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id FROM DataSource
+        WHERE status IN ('active', 'connected')
+          AND json_extract(config, '$.tableName') IS NOT NULL
+        ORDER BY id
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def run_batch(db_path, data_source_ids=None, workers=0, options=None, write=None):
+    """
+    Optimize many data sources in one process.
+    
+    Runs share one SQLite connection and the loaded libraries, and solve on
+    a thread pool of `workers` threads (0 = all cores); solver subprocesses
+    and NumPy work release the GIL. Solved runs are saved by a single
+    ResultWriter thread, so writes overlap the next solves instead of
+    following them. data_source_ids None means every active data source.
+    One JSON summary line per source is written as runs finish, and the
+    aggregate summary is returned.
+    """
+    start_time = datetime.now()
+    write = write or (lambda text: (sys.stdout.write(text), sys.stdout.flush()))
+    shared = SharedConnection(db_path)
+    summaries = []
+    summaries_lock = threading.Lock()
+    
+    def report(data_source_id, summary_future):
+        summary = {'data_source_id': data_source_id, **summary_future.result()}
+        with summaries_lock:
+            summaries.append(summary)
+            write(json.dumps(summary, default=str) + '\n')
+    
+    try:
+        if data_source_ids is None:
+            conn = shared.acquire()
+            try:
+                data_source_ids = active_data_source_ids(conn)
+            finally:
+                shared.release()
+        
+        workers = min(workers or os.cpu_count() or 1, max(len(data_source_ids), 1))
+        writer = ResultWriter(db_path, depth=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(RMOOptimizer(db_path, data_source_id, options, shared).run_pipelined, writer): data_source_id
+                    for data_source_id in data_source_ids
+                }
+                for future in as_completed(futures):
+                    future.result().add_done_callback(
+                        lambda summary_future, data_source_id=futures[future]: report(data_source_id, summary_future)
+                    )
+        finally:
+            writer.close()
+    finally:
+        shared.close()
+    
+    succeeded = [summary for summary in summaries if summary['success']]
+    return {
+        'success': len(succeeded) == len(summaries),
+        'batch': True,
+        'sources': len(summaries),
+        'succeeded': len(succeeded),
+        'failed': len(summaries) - len(succeeded),
+        'results_count': sum(summary.get('results_count', 0) for summary in succeeded),
+        'workers': workers,
+        'wall_time_ms': int((datetime.now() - start_time).total_seconds() * 1000)
+    }
+
+
+def parse_batch_args(args):
+    """Parse '--batch' arguments: <db_path> (--all-active | <id> ...) [--workers N] [--options JSON]"""
+    parser = argparse.ArgumentParser(prog='optimization_runner.py --batch', add_help=False)
+    parser.add_argument('db_path')
+    parser.add_argument('data_source_ids', nargs='*')
+    parser.add_argument('--all-active', action='store_true')
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--options', type=json.loads, default=None)
+    
+    parsed = parser.parse_args(args)
+    if parsed.all_active == bool(parsed.data_source_ids):
+        raise ValueError('Give either data source ids or --all-active')
+    if not isinstance(parsed.options or {}, dict):
+        raise ValueError('--options must be a JSON object')
+    return parsed
+
+
+USAGE = (
+    'Usage: python optimization_runner.py <db_path> <data_source_id> [options_json]\n'
+    '       python optimization_runner.py --worker [--socket <path>]\n'
+    '       python optimization_runner.py --batch <db_path> (--all-active | <data_source_id> ...)'
+    ' [--workers N] [--options options_json]'
+)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
+    if len(sys.argv) >= 2 and sys.argv[1] == '--worker':
+        if len(sys.argv) == 2:
+            run_worker()
+        elif len(sys.argv) == 4 and sys.argv[2] == '--socket':
+            run_worker(sys.argv[3])
+        else:
+            print(json.dumps({'success': False, 'error': USAGE}))
+            sys.exit(1)
+        sys.exit(0)
+    
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        try:
+            batch_args = parse_batch_args(sys.argv[2:])
+        except SystemExit:
+            print(json.dumps({'success': False, 'error': USAGE}))
+            sys.exit(1)
+        except ValueError as e:
+            print(json.dumps({'success': False, 'error': f"{e}\n{USAGE}"}))
+            sys.exit(1)
+        
+        aggregate = run_batch(
+            batch_args.db_path,
+            None if batch_args.all_active else batch_args.data_source_ids,
+            batch_args.workers,
+            batch_args.options
+        )
+        print(json.dumps(aggregate, default=str))
+        sys.exit(0 if aggregate['success'] else 1)
+    
+    if len(sys.argv) not in (3, 4):
         print(json.dumps({
             'success': False,
-            'error': 'Usage: python optimization_runner.py <db_path> <data_source_id>'
+            'error': USAGE
         }))
         sys.exit(1)
     
     db_path = sys.argv[1]
     data_source_id = sys.argv[2]
+    options = json.loads(sys.argv[3]) if len(sys.argv) == 4 else None
     
-    optimizer = RMOOptimizer(db_path, data_source_id)
+    optimizer = RMOOptimizer(db_path, data_source_id, options)
     result = optimizer.run()
     
     print(json.dumps(result, default=str))